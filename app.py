@@ -1,23 +1,73 @@
 import os
-from flask import Flask, send_from_directory
+from flask import Flask
 from flask_cors import CORS
-from src.models.user import db, User, File, Settings
+from src.models.user import db, User, File
+from src.services.hashing import password_hasher
+from src.services.ingest import IngestRequest
+from src.services.jobs import job_queue
 from src.routes.user import user_bp
 from src.routes.auth import auth_bp
 from src.routes.files import files_bp
+from src.routes.uploads import uploads_bp
+from src.routes.settings import settings_bp
+from src.routes.system import system_bp
+from src.services.bootstrap import initialize_database
+from src.services.database import engine_options, init_engine
+from src.services.metrics import metrics
+from src.services.assets import static_assets
+from src.services.playlist import playlist_manifest, preload_links
+from src.commands import register_commands
 
 app = Flask(__name__, static_folder='static')
+app.request_class = IngestRequest
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dashboard_app_secret_key_2024')
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max file size
+app.config['MAX_UPLOAD_SIZE'] = 500 * 1024 * 1024  # limite total dos uploads em blocos
+# Uploads em blocos sem atividade por mais que isso são removidos (segundos, 0 desativa)
+app.config['PARTIAL_UPLOAD_TTL'] = int(os.environ.get('PARTIAL_UPLOAD_TTL', 24 * 3600))
+
+# Cache de permissões do usuário logado por processo (segundos, 0 desativa)
+app.config['PRINCIPAL_CACHE_TTL'] = int(os.environ.get('PRINCIPAL_CACHE_TTL', 0))
+
+# Hash de senhas: método do Werkzeug e pool que executa o hash fora da requisição
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+app.config['PASSWORD_HASH_QUEUE'] = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+app.config['PASSWORD_HASH_TIMEOUT'] = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 5))
+password_hasher.init_app(app)
+
+# Fila de tarefas em segundo plano (threads por processo; 0 = apenas o comando run-jobs)
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['JOB_POLL_INTERVAL'] = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+job_queue.init_app(app)
 
 # Configuração CORS
 CORS(app)
 
 # Configuração de upload
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(__file__), 'uploads'))
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
+# Estado compartilhado entre workers (versões de cache)
+app.config['STATE_FOLDER'] = os.path.join(UPLOAD_FOLDER, '.state')
+
+# Reconciliação entre UPLOAD_FOLDER e a tabela File (comando reconcile-storage
+# e tarefa em segundo plano): arquivos por lote, idade mínima de um órfão (s),
+# pausa entre lotes (s), duração de cada fatia da tarefa (s), intervalo entre
+# execuções agendadas (s, 0 = apenas sob demanda) e dias na quarentena
+app.config['RECONCILE_BATCH_SIZE'] = int(os.environ.get('RECONCILE_BATCH_SIZE', 500))
+app.config['RECONCILE_MIN_AGE'] = int(os.environ.get('RECONCILE_MIN_AGE', 3600))
+app.config['RECONCILE_BATCH_PAUSE'] = float(os.environ.get('RECONCILE_BATCH_PAUSE', 0.05))
+app.config['RECONCILE_SLICE_SECONDS'] = float(os.environ.get('RECONCILE_SLICE_SECONDS', 20))
+app.config['RECONCILE_INTERVAL'] = int(os.environ.get('RECONCILE_INTERVAL', 0))
+app.config['RECONCILE_QUARANTINE_DAYS'] = int(os.environ.get('RECONCILE_QUARANTINE_DAYS', 14))
+
+# Métricas de desempenho em /api/metrics (formato Prometheus); com token, o
+# endpoint exige o cabeçalho "Authorization: Bearer <token>"
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '0') == '1'
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
 # Configuração do banco de dados
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
@@ -32,66 +82,56 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(database_dir, 'app.db')}"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Pool de conexões (0 = tamanho automático conforme o tipo de worker do gunicorn)
+app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 0))
+app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+app.config['DB_POOL_TIMEOUT'] = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+app.config['DB_POOL_RECYCLE'] = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+# Tempo máximo por comando no PostgreSQL (ms, 0 desativa)
+app.config['DB_STATEMENT_TIMEOUT'] = int(os.environ.get('DB_STATEMENT_TIMEOUT', 30000))
+# SQLite: espera pelo lock de escrita (ms) e nível de sincronização do WAL
+app.config['SQLITE_BUSY_TIMEOUT'] = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 15000))
+app.config['SQLITE_SYNCHRONOUS'] = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
 db.init_app(app)
+with app.app_context():
+    init_engine(app, db.engine)
+metrics.init_app(app)
 
 # Registrar blueprints
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(files_bp, url_prefix='/api')
+app.register_blueprint(uploads_bp, url_prefix='/api')
+app.register_blueprint(settings_bp, url_prefix='/api')
+app.register_blueprint(system_bp, url_prefix='/api')
 
-def create_admin_user():
-    """Cria o usuário admin padrão se não existir"""
-    admin = User.query.filter_by(username='Admin').first()
-    if not admin:
-        admin = User(
-            username='Admin',
-            role='admin',
-            can_upload=True
-        )
-        admin.set_password('Admin')
-        db.session.add(admin)
-        db.session.commit()
-        print("Usuário admin criado: Admin/Admin")
-
-def create_default_settings():
-    """Cria configurações padrão"""
-    default_settings = [
-        ('default_display_time', '10', 'Tempo padrão de exibição em segundos'),
-        ('auto_rotation', 'true', 'Rotação automática ativada'),
-        ('app_title', 'Dashboard App', 'Título da aplicação')
-    ]
-    
-    for key, value, description in default_settings:
-        setting = Settings.query.filter_by(key=key).first()
-        if not setting:
-            setting = Settings(key=key, value=value, description=description)
-            db.session.add(setting)
-    
-    db.session.commit()
-
-# Criar tabelas e dados iniciais
-with app.app_context():
-    db.create_all()
-    create_admin_user()
-    create_default_settings()
+# Comandos de linha de comando
+register_commands(app)
+
+# Frontend em memória: nomes versionados, gzip/brotli e cache imutável
+static_assets.init_app(app)
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-        return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+    response = static_assets.response(path)
+    if response.status_code == 200 and response.mimetype == 'text/html':
+        # O navegador começa a baixar o início da playlist junto com a página
+        try:
+            for link in preload_links(playlist_manifest.get()):
+                response.headers.add('Link', link)
+        except Exception:
+            db.session.rollback()
+    return response
 
 if __name__ == '__main__':
+    # Em produção o esquema e os dados iniciais são criados pelo comando
+    # init-db (executado pelo gunicorn antes dos workers); a importação do app
+    # não acessa o banco
+    with app.app_context():
+        initialize_database()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
 
@@ -0,0 +1,197 @@
+"""Utilitários compartilhados pelos benchmarks
+
+Cada benchmark roda a aplicação em um subprocesso (gunicorn quando instalado,
+senão o servidor do Werkzeug) contra um banco SQLite e uma pasta de uploads
+temporários, para não tocar nos dados de desenvolvimento.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+import http.client
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, ROOT)
+
+from src.services import server  # noqa: E402  (só biblioteca padrão)
+
+
+@contextmanager
+def temp_environment(database_url=None, initialize=True, **extra):
+    """Cria pastas temporárias e retorna o ambiente para os subprocessos
+
+    Com ``initialize``, o banco temporário é criado pelo comando init-db
+    (a importação do app não cria tabelas).
+    """
+    workdir = tempfile.mkdtemp(prefix='dashboard-bench-')
+    env = dict(os.environ)
+    env['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    env['DATABASE_URL'] = database_url or f"sqlite:///{os.path.join(workdir, 'app.db')}"
+    env['PYTHONPATH'] = ROOT
+    env.update({key: str(value) for key, value in extra.items()})
+    try:
+        if initialize:
+            init_database(env)
+        yield env
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def init_database(env, root=ROOT):
+    """Cria tabelas e dados iniciais com o comando init-db"""
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], env=env, cwd=root,
+                   check=True, stdout=subprocess.DEVNULL)
+
+
+def run_in_app(env, code):
+    """Executa código Python com o app importado (variáveis app, db, User, File, Settings)"""
+    script = 'from app import app, db, User, File\nfrom src.models.user import Settings\n'
+    script += 'with app.app_context():\n'
+    script += ''.join(f'    {line}\n' for line in code.strip().splitlines())
+    subprocess.run([sys.executable, '-c', script], env=env, cwd=ROOT, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def seed_users(env, count, password='bench-password'):
+    """Cria usuários bench0..benchN-1 com a mesma senha"""
+    run_in_app(env, f'''
+for i in range({count}):
+    if not User.query.filter_by(username=f'bench{{i}}').first():
+        user = User(username=f'bench{{i}}', role='admin', can_upload=True)
+        user.set_password({password!r})
+        db.session.add(user)
+db.session.commit()
+''')
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def resolve_worker_class(env, worker_class=None):
+    """Tipo de worker que running_server usará com o ambiente ``env``
+
+    Sem ``worker_class``, é o mesmo padrão do gunicorn.conf.py para o banco de
+    ``env`` (gevent só com PostgreSQL e psycogreen, senão gthread). Sem
+    gunicorn instalado, o servidor é o do Werkzeug.
+    """
+    if not shutil.which('gunicorn'):
+        return 'werkzeug'
+    return worker_class or server.worker_class(env)
+
+
+@contextmanager
+def running_server(env, worker_class=None, workers=1, threads=8, root=ROOT):
+    """Sobe o app em um subprocesso e retorna (host, porta)"""
+    port = _free_port()
+    worker_class = resolve_worker_class(env, worker_class)
+    if worker_class != 'werkzeug':
+        command = ['gunicorn', 'app:app', '-b', f'127.0.0.1:{port}', '-w', str(workers),
+                   '-k', worker_class, '--threads', str(threads), '--log-level', 'warning']
+    else:
+        command = [sys.executable, '-c',
+                   'from werkzeug.serving import run_simple; from app import app; '
+                   f'run_simple("127.0.0.1", {port}, app, threaded=True)']
+
+    process = subprocess.Popen(command, env=env, cwd=root,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port, process)
+        yield '127.0.0.1', port
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('O servidor terminou durante a inicialização')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('O servidor não respondeu a tempo')
+
+
+def percentile(values, fraction):
+    """Percentil por vizinho mais próximo de uma lista de valores"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def run_load(host, port, make_request, concurrency, total):
+    """Executa ``total`` requisições com ``concurrency`` clientes em paralelo
+
+    ``make_request(conn, i)`` recebe uma HTTPConnection e o número da
+    requisição, e retorna o status HTTP.
+    """
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def client():
+        conn = http.client.HTTPConnection(host, port, timeout=60)
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            started = time.perf_counter()
+            try:
+                status = make_request(conn, i)
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=60)
+                status = 'error'
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] = statuses.get(status, 0) + 1
+        conn.close()
+
+    started = time.perf_counter()
+    clients = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'duration_s': round(duration, 4),
+        'throughput_rps': round(total / duration, 2) if duration else None,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'statuses': {str(key): value for key, value in statuses.items()},
+    }
+
+
+def emit(results, output=None):
+    """Escreve os resultados em JSON (stdout ou arquivo)"""
+    data = json.dumps(results, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
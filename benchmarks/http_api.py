@@ -0,0 +1,265 @@
+"""Benchmark de carga da API HTTP: login, listagem, playlist, mídia e upload
+
+Uso:
+    python benchmarks/http_api.py --users 20 --files 50 --file-sizes 256K,4M --concurrency 1,16,64
+    python benchmarks/http_api.py --database-url postgresql://localhost/bench --output head.json
+    python benchmarks/http_api.py --baseline head.json
+
+Sobe o app (gunicorn) sobre um banco e uma pasta de uploads temporários,
+cria N usuários e envia M arquivos pela própria API (os tamanhos se
+alternam entre os valores de ``--file-sizes``) e mede vazão e latência
+p50/p99 de cada cenário em cada nível de concorrência:
+
+- ``login``: POST /api/auth/login
+- ``files``: GET /api/files (painel administrativo)
+- ``active``: GET /api/files/active (o que cada display consulta)
+- ``serve``: GET /api/serve/<arquivo> completo
+- ``serve_range``: GET /api/serve/<arquivo> com Range (início do vídeo, seek)
+- ``upload``: POST /api/upload com conteúdo novo a cada requisição
+
+Os resultados saem em JSON com a revisão do git e os parâmetros, para
+comparar commits; com ``--baseline`` cada cenário recebe a razão de vazão e
+de p99 em relação a um resultado anterior. Com ``--database-url`` o banco
+informado (ex.: um PostgreSQL local) é usado no lugar do SQLite temporário;
+ele deve estar vazio ou ser descartável.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import subprocess
+import http.client
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import ROOT, temp_environment, seed_users, resolve_worker_class, running_server, run_load, emit
+
+PASSWORD = 'bench-password'
+
+SCENARIOS = ('login', 'files', 'active', 'serve', 'serve_range', 'upload')
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+BOUNDARY = 'dashboard-bench-boundary'
+
+
+def parse_size(value):
+    """Converte '256K', '4M' ou '1024' em bytes"""
+    value = value.strip().upper()
+    if value[-1:] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def pdf_content(size, seed):
+    """PDF sintético com ``size`` bytes e conteúdo único (sem deduplicação)"""
+    header = f'%PDF-1.4\n% dashboard-bench {seed}\n'.encode()
+    rng = random.Random(seed)
+    return header + rng.randbytes(max(size - len(header), 0))
+
+
+def multipart_body(filename, content):
+    head = (
+        f'--{BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="display_time"\r\n\r\n10\r\n'
+        f'--{BOUNDARY}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/pdf\r\n\r\n'
+    ).encode()
+    return head + content + f'\r\n--{BOUNDARY}--\r\n'.encode()
+
+
+def login(host, port, username):
+    """Faz login e retorna o cookie de sessão"""
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        conn.request('POST', '/api/auth/login', body=json.dumps({'username': username, 'password': PASSWORD}),
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f'Login de {username} falhou: HTTP {response.status}')
+        return response.getheader('Set-Cookie').split(';', 1)[0]
+    finally:
+        conn.close()
+
+
+def upload(conn, cookie, filename, content):
+    body = multipart_body(filename, content)
+    conn.request('POST', '/api/upload', body=body, headers={
+        'Content-Type': f'multipart/form-data; boundary={BOUNDARY}',
+        'Cookie': cookie,
+    })
+    response = conn.getresponse()
+    data = response.read()
+    return response.status, data
+
+
+def seed_files(host, port, cookie, count, sizes):
+    """Envia os arquivos iniciais pela API e retorna [(nome servido, tamanho)]"""
+    files = []
+    conn = http.client.HTTPConnection(host, port, timeout=300)
+    try:
+        for i in range(count):
+            size = sizes[i % len(sizes)]
+            status, data = upload(conn, cookie, f'seed{i}.pdf', pdf_content(size, f'seed-{i}'))
+            if status != 201:
+                raise RuntimeError(f'Upload inicial falhou: HTTP {status} {data[:200]!r}')
+            files.append((json.loads(data)['file']['filename'], size))
+    finally:
+        conn.close()
+    return files
+
+
+def wait_for_jobs(host, port, cookie, timeout=300):
+    """Espera a fila de tarefas (pré-visualizações, miniaturas) esvaziar
+
+    Sem isso, o processamento dos arquivos iniciais disputaria CPU e banco
+    com as requisições medidas.
+    """
+    deadline = time.monotonic() + timeout
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    try:
+        while time.monotonic() < deadline:
+            conn.request('GET', '/api/jobs?limit=1', headers={'Cookie': cookie})
+            response = conn.getresponse()
+            counts = json.loads(response.read()).get('counts', {})
+            if not counts.get('pending') and not counts.get('running'):
+                return
+            time.sleep(0.5)
+    finally:
+        conn.close()
+    raise RuntimeError('A fila de tarefas não esvaziou a tempo')
+
+
+def scenario_request(name, cookies, files, range_size, upload_size):
+    """Função de requisição de um cenário para run_load"""
+    login_bodies = [json.dumps({'username': f'bench{i}', 'password': PASSWORD}) for i in range(len(cookies))]
+
+    def get(conn, path, headers=None):
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    def make_request(conn, i):
+        cookie = cookies[i % len(cookies)]
+        if name == 'login':
+            conn.request('POST', '/api/auth/login', body=login_bodies[i % len(login_bodies)],
+                         headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        if name == 'files':
+            return get(conn, '/api/files', {'Cookie': cookie})
+        if name == 'active':
+            return get(conn, '/api/files/active')
+        filename, size = files[i % len(files)]
+        if name == 'serve':
+            return get(conn, f'/api/serve/{filename}')
+        if name == 'serve_range':
+            start = random.randrange(max(size - range_size, 0) + 1)
+            end = min(start + range_size, size) - 1
+            return get(conn, f'/api/serve/{filename}', {'Range': f'bytes={start}-{end}'})
+        status, _ = upload(conn, cookie, f'load{i}.pdf', pdf_content(upload_size, f'load-{time.time_ns()}-{i}'))
+        return status
+    return make_request
+
+
+def git_revision():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                           capture_output=True, text=True).stdout.strip()
+    return result.stdout.strip() + ('-dirty' if dirty else '')
+
+
+def compare(results, baseline_path):
+    """Acrescenta a cada cenário a razão em relação ao mesmo cenário do baseline"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    previous = {(item['scenario'], item['concurrency']): item for item in baseline['results']}
+    for item in results:
+        before = previous.get((item['scenario'], item['concurrency']))
+        if not before or not before['throughput_rps'] or not before['p99_ms']:
+            continue
+        item['baseline'] = {
+            'revision': baseline.get('revision'),
+            'throughput_ratio': round(item['throughput_rps'] / before['throughput_rps'], 3),
+            'p99_ratio': round(item['p99_ms'] / before['p99_ms'], 3),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='cenários separados por vírgula')
+    parser.add_argument('--concurrency', default='1,8,32', help='níveis de concorrência separados por vírgula')
+    parser.add_argument('--requests', type=int, default=200, help='requisições por cenário e nível')
+    parser.add_argument('--upload-requests', type=int, default=20, help='requisições dos cenários de upload e login')
+    parser.add_argument('--users', type=int, default=10, help='usuários criados')
+    parser.add_argument('--files', type=int, default=20, help='arquivos enviados antes das medições')
+    parser.add_argument('--file-sizes', default='256K,2M', help='tamanhos dos arquivos, alternados')
+    parser.add_argument('--upload-size', default='1M', help='tamanho de cada upload do cenário upload')
+    parser.add_argument('--range-size', default='256K', help='bytes pedidos no cenário serve_range')
+    parser.add_argument('--database-url', help='banco a usar (padrão: SQLite temporário)')
+    parser.add_argument('--worker-class', help='tipo de worker do gunicorn (padrão: o do gunicorn.conf.py para o banco)')
+    parser.add_argument('--workers', type=int, default=2, help='workers do gunicorn')
+    parser.add_argument('--seed', type=int, default=0, help='semente dos offsets de Range')
+    parser.add_argument('--baseline', help='JSON de uma execução anterior para comparação')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',')]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'cenários desconhecidos: {", ".join(sorted(unknown))}')
+    # Uploads acrescentam arquivos à playlist: sempre por último
+    scenarios.sort(key=SCENARIOS.index)
+    levels = [int(value) for value in args.concurrency.split(',')]
+    sizes = [parse_size(value) for value in args.file_sizes.split(',')]
+    random.seed(args.seed)
+
+    results = []
+    with temp_environment(args.database_url, METRICS_ENABLED='0') as env:
+        seed_users(env, args.users, PASSWORD)
+        worker_class = resolve_worker_class(env, args.worker_class)
+        with running_server(env, worker_class=worker_class, workers=args.workers) as (host, port):
+            cookies = [login(host, port, f'bench{i}') for i in range(args.users)]
+            files = seed_files(host, port, cookies[0], args.files, sizes)
+            wait_for_jobs(host, port, cookies[0])
+
+            for name in scenarios:
+                make_request = scenario_request(name, cookies, files, parse_size(args.range_size),
+                                                parse_size(args.upload_size))
+                total = args.upload_requests if name in ('login', 'upload') else args.requests
+                for concurrency in levels:
+                    result = run_load(host, port, make_request, concurrency, total)
+                    result['scenario'] = name
+                    results.append(result)
+                if name == 'upload':
+                    wait_for_jobs(host, port, cookies[0])
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+    emit({
+        'benchmark': 'http_api',
+        'revision': git_revision(),
+        'python': sys.version.split()[0],
+        'database': 'sqlite' if not args.database_url else args.database_url.split(':', 1)[0],
+        'worker_class': worker_class,
+        'workers': args.workers,
+        'users': args.users,
+        'files': args.files,
+        'file_sizes': sizes,
+        'results': results,
+    }, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Benchmark de logins simultâneos com e sem o pool de hashing de senhas
+
+Uso:
+    python benchmarks/login_throughput.py --concurrency 1,8,32 --hash-workers 0,2,4
+
+``--hash-workers 0`` executa o PBKDF2 dentro da requisição (comportamento
+anterior); valores maiores usam o pool de src/services/hashing.py. Com workers
+gevent, o hash na requisição bloqueia o worker inteiro, e o pool permite que
+outros logins e o restante do dashboard continuem sendo atendidos. Por isso,
+além da vazão de logins, o benchmark mede a latência de /api/files/active
+(o que os displays consultam) durante a rajada de logins.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import http.client
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import temp_environment, seed_users, resolve_worker_class, running_server, run_load, percentile, emit
+
+PASSWORD = 'bench-password'
+
+
+def login_request(users):
+    body = {f'bench{i}': json.dumps({'username': f'bench{i}', 'password': PASSWORD}) for i in range(users)}
+
+    def make_request(conn, i):
+        conn.request('POST', '/api/auth/login', body=body[f'bench{i % users}'],
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    return make_request
+
+
+class Probe(threading.Thread):
+    """Mede a latência de /api/files/active enquanto os logins acontecem"""
+
+    def __init__(self, host, port):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.latencies = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        while not self.stopped.is_set():
+            started = time.perf_counter()
+            conn.request('GET', '/api/files/active')
+            conn.getresponse().read()
+            self.latencies.append(time.perf_counter() - started)
+            time.sleep(0.05)
+        conn.close()
+
+    def summary(self):
+        self.stopped.set()
+        self.join()
+        return {
+            'probe_p50_ms': round(percentile(self.latencies, 0.50) * 1000, 2),
+            'probe_p99_ms': round(percentile(self.latencies, 0.99) * 1000, 2),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='1,8,32', help='níveis de concorrência separados por vírgula')
+    parser.add_argument('--requests', type=int, default=64, help='logins por nível de concorrência')
+    parser.add_argument('--users', type=int, default=8, help='usuários criados para o teste')
+    parser.add_argument('--hash-workers', default='0,2', help='tamanhos do pool de hashing a comparar')
+    parser.add_argument('--hash-method', default=None, help='PASSWORD_HASH_METHOD (padrão: o do app)')
+    parser.add_argument('--worker-class', help='tipo de worker do gunicorn (padrão: o do gunicorn.conf.py para o banco)')
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args()
+
+    extra = {'PASSWORD_HASH_METHOD': args.hash_method} if args.hash_method else {}
+    results = []
+    with temp_environment(**extra) as env:
+        seed_users(env, args.users, PASSWORD)
+        worker_class = resolve_worker_class(env, args.worker_class)
+
+        for hash_workers in [int(value) for value in args.hash_workers.split(',')]:
+            env['PASSWORD_HASH_WORKERS'] = str(hash_workers)
+            with running_server(env, worker_class=worker_class) as (host, port):
+                for concurrency in [int(value) for value in args.concurrency.split(',')]:
+                    probe = Probe(host, port)
+                    probe.start()
+                    result = run_load(host, port, login_request(args.users), concurrency, args.requests)
+                    result.update(probe.summary())
+                    result.update({'scenario': 'login', 'hash_workers': hash_workers,
+                                   'worker_class': worker_class})
+                    results.append(result)
+
+    emit(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
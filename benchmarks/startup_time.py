@@ -0,0 +1,136 @@
+"""Benchmark de inicialização: importação do app e tempo até a primeira resposta
+
+Uso:
+    python benchmarks/startup_time.py --runs 5 --workers 1,4
+    python benchmarks/startup_time.py --compare HEAD~1
+
+Mede, em processos novos, o tempo de ``import app`` e quantas consultas ao
+banco ele executa (deve ser zero: o esquema e os dados iniciais ficam com o
+comando init-db), e o tempo entre iniciar o gunicorn e a primeira resposta
+200, como em um restart no Render. Com ``--compare``, a mesma medição é feita
+em uma revisão anterior (extraída com git archive) sobre o mesmo banco.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import http.client
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common import ROOT, temp_environment, resolve_worker_class, running_server, percentile, emit
+
+# Conta as consultas executadas durante a importação do app
+IMPORT_SCRIPT = '''
+import json, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+queries = []
+event.listen(Engine, 'before_cursor_execute', lambda *args: queries.append(args[2]))
+
+started = time.perf_counter()
+import app
+elapsed = time.perf_counter() - started
+print(json.dumps({'seconds': elapsed, 'queries': len(queries)}))
+'''
+
+
+def measure_import(env, root, runs):
+    durations, queries = [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], env=env, cwd=root, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        durations.append(result['seconds'])
+        queries.append(result['queries'])
+    return {
+        'runs': runs,
+        'import_p50_ms': round(percentile(durations, 0.50) * 1000, 2),
+        'import_max_ms': round(max(durations) * 1000, 2),
+        'queries_per_import': max(queries),
+    }
+
+
+def _first_ok(host, port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request('GET', '/')
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.02)
+    raise RuntimeError('O servidor não respondeu 200 a tempo')
+
+
+def measure_boot(env, root, workers, runs, worker_class):
+    durations = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with running_server(env, worker_class=worker_class, workers=workers, root=root) as (host, port):
+            _first_ok(host, port)
+            durations.append(time.perf_counter() - started)
+    return {
+        'workers': workers,
+        'first_response_p50_ms': round(percentile(durations, 0.50) * 1000, 2),
+        'first_response_max_ms': round(max(durations) * 1000, 2),
+    }
+
+
+def measure(env, root, args):
+    env = dict(env, PYTHONPATH=root)
+    return {
+        'import': measure_import(env, root, args.runs),
+        'boot': [measure_boot(env, root, workers, args.runs, args.worker_class)
+                 for workers in args.workers],
+    }
+
+
+def extract_revision(revision, destination):
+    """Extrai os arquivos de uma revisão do git em ``destination``"""
+    archive = subprocess.Popen(['git', 'archive', revision], cwd=ROOT, stdout=subprocess.PIPE)
+    subprocess.run(['tar', '-x', '-C', destination], stdin=archive.stdout, check=True)
+    archive.stdout.close()
+    if archive.wait() != 0:
+        raise RuntimeError(f'git archive falhou para {revision}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', default='1,4', help='quantidades de workers do gunicorn')
+    parser.add_argument('--worker-class', help='tipo de worker do gunicorn (padrão: o do gunicorn.conf.py para o banco)')
+    parser.add_argument('--compare', metavar='REV', help='revisão do git usada como referência')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    args.workers = [int(value) for value in args.workers.split(',')]
+
+    results = {'runs': args.runs}
+    with temp_environment() as env:
+        # A mesma classe nas duas revisões, para a comparação ser justa
+        args.worker_class = results['worker_class'] = resolve_worker_class(env, args.worker_class)
+        results['current'] = measure(env, ROOT, args)
+
+        if args.compare:
+            old_root = tempfile.mkdtemp(prefix='dashboard-bench-rev-')
+            try:
+                extract_revision(args.compare, old_root)
+                results['compare'] = {'revision': args.compare, **measure(env, old_root, args)}
+            finally:
+                shutil.rmtree(old_root, ignore_errors=True)
+
+    emit(results, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import subprocess
+
+# Configuração do gunicorn (lida automaticamente a partir do diretório do app)
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+# Os workers não acessam o banco ao importar o app (o seed roda uma vez em
+# on_starting), então vários podem subir em paralelo
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+
+# Workers gevent: centenas de conexões SSE ociosas (/api/files/events) e streams
+# de vídeo longos não prendem um worker cada. Só são o padrão com PostgreSQL e
+# psycogreen (consultas cooperativas, ver post_fork); com SQLite cada consulta
+# bloquearia o worker inteiro, e o padrão é gthread. Com gthread a entrega de
+# mídia usa os.sendfile (cópia zero), mas cada conexão ocupa uma thread; com
+# gevent o envio é feito em blocos pelo próprio worker.
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src.services.server import worker_class as _configured_worker_class
+
+worker_class = _configured_worker_class()
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Entrega de arquivos com cópia zero (os.sendfile)
+sendfile = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+keepalive = 5
+
+
+def on_starting(server):
+    # Esquema e dados iniciais uma única vez, antes de criar os workers, e só
+    # quando o esquema mudou desde o último init-db (carimbo em STATE_FOLDER)
+    # ou o banco não tem as tabelas (recriado depois do carimbo).
+    # INIT_DB_ON_START=always força a execução; 0 desativa (rode
+    # `flask --app app init-db` no deploy). Em um subprocesso: o master não
+    # importa o app, que só deve ser carregado nos workers depois do monkey
+    # patching do gevent.
+    mode = os.environ.get('INIT_DB_ON_START', '1')
+    if mode == '0':
+        return
+
+    from src.services.schema_stamp import is_initialized
+    # Mesmo caminho de STATE_FOLDER definido em app.py
+    upload_folder = os.environ.get('UPLOAD_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads'))
+    if mode != 'always' and is_initialized(os.path.join(upload_folder, '.state')):
+        return
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], check=True)
+
+
+def post_fork(server, worker):
+    # psycopg2 cooperativo: enquanto uma consulta espera o PostgreSQL, o loop
+    # do gevent continua atendendo as demais conexões do worker
+    if 'gevent' in server.cfg.worker_class_str:
+        from src.services.server import patch_database_driver
+        if not patch_database_driver():
+            server.log.warning('Workers gevent sem psycogreen: cada consulta ao banco bloqueia o worker')
+
+
+def worker_exit(server, worker):
+    # Encerramento gracioso: termina as tarefas em andamento antes de sair
+    from src.services.jobs import job_queue
+    job_queue.stop()
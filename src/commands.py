@@ -0,0 +1,80 @@
+import click
+from src.models.schema import ensure_indexes, explain_hot_queries
+from src.services.bootstrap import initialize_database
+from src.models.user import db, File
+from src.services.file_tasks import schedule_faststart
+from src.services.jobs import job_queue
+from src.services.reconcile import reconcile_storage, schedule_reconcile
+
+
+def register_commands(app):
+    """Registra os comandos de linha de comando (flask --app app <comando>)"""
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Cria tabelas, índices, usuário admin e configurações padrão (idempotente)"""
+        created = initialize_database()
+        if created:
+            click.echo(f"Índices criados: {', '.join(created)}")
+        click.echo('Banco de dados pronto')
+
+    @app.cli.command('create-indexes')
+    def create_indexes_command():
+        """Cria índices que faltam em bancos já existentes"""
+        created = ensure_indexes()
+        if created:
+            click.echo(f"Índices criados: {', '.join(created)}")
+        else:
+            click.echo('Todos os índices já existem')
+
+    @app.cli.command('explain-queries')
+    def explain_queries_command():
+        """Verifica se as consultas mais frequentes usam índices"""
+        failures = 0
+        for name, plan, uses_index in explain_hot_queries():
+            status = 'OK' if uses_index else 'SEM ÍNDICE'
+            click.echo(f'[{status}] {name}')
+            for line in plan:
+                click.echo(f'    {line}')
+            if not uses_index:
+                failures += 1
+
+        if failures:
+            raise SystemExit(1)
+
+    @app.cli.command('faststart-videos')
+    def faststart_videos_command():
+        """Agenda a reescrita fast start (moov no início) dos vídeos MP4 já enviados"""
+        videos = db.session.query(File.filename, File.file_path).filter(
+            File.file_type == 'video', File.filename.ilike('%.mp4')
+        ).distinct().all()
+        for filename, file_path in videos:
+            schedule_faststart(filename, file_path)
+        db.session.commit()
+        click.echo(f'{len(videos)} vídeos agendados')
+
+    @app.cli.command('run-jobs')
+    def run_jobs_command():
+        """Executa a fila de tarefas em primeiro plano (para uso com JOB_WORKERS=0 na web)"""
+        click.echo('Executando tarefas (Ctrl+C para encerrar)')
+        job_queue.run_forever()
+
+    @app.cli.command('reconcile-storage')
+    @click.option('--apply', is_flag=True, help='Move órfãos para a quarentena e desativa registros sem arquivo')
+    @click.option('--max-seconds', type=float, default=None, help='Para após esse tempo (continua de onde parou na próxima execução)')
+    @click.option('--restart', is_flag=True, help='Descarta o cursor salvo e recomeça do início')
+    @click.option('--background', is_flag=True, help='Agenda na fila de tarefas em vez de executar aqui')
+    def reconcile_storage_command(apply, max_seconds, restart, background):
+        """Procura arquivos sem registro (órfãos) e registros sem arquivo, em lotes retomáveis"""
+        if background:
+            schedule_reconcile(apply)
+            db.session.commit()
+            click.echo('Reconciliação agendada na fila de tarefas')
+            return
+
+        state = reconcile_storage(apply=apply, max_seconds=max_seconds, restart=restart)
+        status = 'concluída' if state['phase'] == 'done' else f"interrompida (fase {state['phase']}, continua na próxima execução)"
+        click.echo(f"Execução {state['run_id']} {status}")
+        click.echo(f"Arquivos verificados: {state['scanned_files']}; registros verificados: {state['scanned_rows']}")
+        click.echo(f"Órfãos: {state['orphans']} ({state['orphan_bytes']} bytes), {state['quarantined']} em quarentena")
+        click.echo(f"Registros sem arquivo: {state['dangling']}, {state['deactivated']} desativados")
@@ -0,0 +1,77 @@
+import re
+from sqlalchemy import func, inspect, select
+from src.models.user import db, File, Job
+
+# Trechos de planos de execução que indicam leitura completa das tabelas consultadas
+SQLITE_FULL_SCAN = re.compile(r'^SCAN (file|job)$|USE TEMP B-TREE FOR ORDER BY')
+POSTGRESQL_FULL_SCAN = re.compile(r'Seq Scan on (file|job)\b')
+
+
+def ensure_indexes():
+    """Cria os índices declarados nos modelos que ainda não existem
+
+    ``db.create_all()`` só cria índices junto com tabelas novas; bancos SQLite
+    ou PostgreSQL já existentes recebem os índices por aqui. É idempotente.
+    """
+    created = []
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            if not inspector.has_index(table.name, index.name):
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+
+def hot_queries():
+    """Consultas mais frequentes da aplicação, usadas na verificação de planos"""
+    return [
+        ('playlist ativa', File.query_with_uploader()
+            .filter(File.is_active.is_(True))
+            .order_by(File.upload_order.asc(), File.id.asc()).statement),
+        ('próxima ordem de upload', select(func.max(File.upload_order))),
+        ('listagem paginada', File.query_with_uploader()
+            .filter(db.tuple_(File.upload_order, File.id) > db.tuple_(0, 0))
+            .order_by(File.upload_order.asc(), File.id.asc()).limit(51).statement),
+        ('arquivos por uploader', File.query_with_uploader()
+            .filter(File.uploaded_by == 1)
+            .order_by(File.upload_order.asc(), File.id.asc()).limit(51).statement),
+        ('arquivo por nome', select(File.id).where(File.filename == 'x')),
+        ('próxima tarefa', select(Job.id)
+            .where(Job.status == 'pending', Job.run_at <= func.current_timestamp())
+            .order_by(Job.run_at, Job.id).limit(3)),
+        ('tarefa por chave', select(Job.id)
+            .where(Job.key == 'x', Job.status.in_(('pending', 'running', 'failed')))),
+    ]
+
+
+def explain_hot_queries():
+    """Retorna (nome, plano, usa_índice) para cada consulta de hot_queries()
+
+    No PostgreSQL o seq scan é desabilitado durante a verificação: em tabelas
+    pequenas o planejador sempre prefere ler tudo, então o que se verifica é
+    que existe um caminho por índice para cada consulta.
+    """
+    dialect = db.engine.dialect
+    results = []
+    with db.engine.connect() as conn:
+        if dialect.name == 'postgresql':
+            conn.exec_driver_sql('SET enable_seqscan = off')
+
+        for name, statement in hot_queries():
+            sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            if dialect.name == 'sqlite':
+                rows = conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+                plan = [row[-1] for row in rows]
+                full_scan = SQLITE_FULL_SCAN
+            else:
+                rows = conn.exec_driver_sql(f'EXPLAIN {sql}').fetchall()
+                plan = [row[0] for row in rows]
+                full_scan = POSTGRESQL_FULL_SCAN
+
+            uses_index = not any(full_scan.search(line.strip()) for line in plan)
+            results.append((name, plan, uses_index))
+
+        if dialect.name == 'postgresql':
+            conn.exec_driver_sql('RESET enable_seqscan')
+    return results
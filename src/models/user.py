@@ -1,5 +1,5 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.services.hashing import password_hasher
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -19,12 +19,16 @@ class User(db.Model):
         return f'<User {self.username}>'
 
     def set_password(self, password):
-        """Define a senha do usuário com hash"""
-        self.password_hash = generate_password_hash(password)
+        """Define a senha do usuário com hash (executado no pool de hashing)"""
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        """Verifica se a senha está correta"""
-        return check_password_hash(self.password_hash, password)
+        """Verifica se a senha está correta (executado no pool de hashing)"""
+        return password_hasher.verify(self.password_hash, password)
+
+    def needs_rehash(self):
+        """Verifica se o hash da senha usa parâmetros antigos"""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def is_admin(self):
         """Verifica se o usuário é admin"""
@@ -56,22 +60,58 @@ class File(db.Model):
     uploaded_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Listagem paginada (upload_order, id) e cálculo de max(upload_order)
+        db.Index('ix_file_upload_order_id', 'upload_order', 'id'),
+        # Playlist do dashboard: índice parcial apenas com os arquivos ativos
+        db.Index(
+            'ix_file_active_upload_order', 'upload_order', 'id',
+            postgresql_where=is_active.is_(True),
+            sqlite_where=is_active.is_(True)
+        ),
+        # Filtro por uploader (já ordenado) e verificação da chave estrangeira
+        db.Index('ix_file_uploaded_by_order', 'uploaded_by', 'upload_order', 'id'),
+        # Índice de arquivos servidos (/api/serve)
+        db.Index('ix_file_filename', 'filename'),
+    )
+
     def __repr__(self):
         return f'<File {self.original_name}>'
 
     def to_dict(self):
+        return File._serialize(self, self.uploader.username if self.uploader else None)
+
+    @staticmethod
+    def query_with_uploader():
+        """Consulta as colunas do arquivo e o nome do uploader em um único JOIN
+
+        Usada pelas listagens para evitar uma consulta extra por arquivo
+        (N+1) e a hidratação de objetos ORM.
+        """
+        return db.session.query(
+            *File.__table__.columns,
+            User.username.label('uploader_name')
+        ).outerjoin(User, File.uploaded_by == User.id)
+
+    @staticmethod
+    def row_to_dict(row):
+        """Serializa uma linha retornada por query_with_uploader"""
+        return File._serialize(row, row.uploader_name)
+
+    @staticmethod
+    def _serialize(source, uploader_name):
         return {
-            'id': self.id,
-            'filename': self.filename,
-            'original_name': self.original_name,
-            'file_type': self.file_type,
-            'file_path': self.file_path,
-            'display_time': self.display_time,
-            'is_active': self.is_active,
-            'upload_order': self.upload_order,
-            'uploaded_by': self.uploaded_by,
-            'uploaded_at': self.uploaded_at.isoformat() if self.uploaded_at else None,
-            'uploader_name': self.uploader.username if self.uploader else None
+            'id': source.id,
+            'filename': source.filename,
+            'original_name': source.original_name,
+            'file_type': source.file_type,
+            'file_path': source.file_path,
+            'display_time': source.display_time,
+            'is_active': source.is_active,
+            'upload_order': source.upload_order,
+            'uploaded_by': source.uploaded_by,
+            'uploaded_at': source.uploaded_at.isoformat() if source.uploaded_at else None,
+            'uploader_name': uploader_name
         }
 
 
@@ -92,3 +132,44 @@ class Settings(db.Model):
             'description': self.description
         }
 
+class Job(db.Model):
+    """Tarefa adiada (remoção de arquivos, pré-visualizações, verificações)
+
+    Persistida no banco para sobreviver a reinícios e ser executada por
+    qualquer worker.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(255))  # evita tarefas duplicadas pendentes
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), default='pending', nullable=False)  # pending, running, done, failed
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_attempts = db.Column(db.Integer, default=3, nullable=False)
+    last_error = db.Column(db.Text)
+    run_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Busca da próxima tarefa a executar
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+        db.Index('ix_job_key', 'key'),
+    )
+
+    def __repr__(self):
+        return f'<Job {self.kind} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'key': self.key,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -1,8 +1,98 @@
-from flask import Blueprint, request, jsonify, session
+import time
+import threading
+from collections import namedtuple
+from functools import wraps
+from flask import Blueprint, request, jsonify, session, g, current_app
 from src.models.user import db, User
+from src.services.hashing import HashingBusy
+from src.services.versioning import SharedCounter
 
 auth_bp = Blueprint('auth', __name__)
 
+
+class Principal(namedtuple('Principal', ['id', 'username', 'role', 'can_upload'])):
+    """Dados de permissão do usuário logado, sem vínculo com a sessão do banco"""
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.role, user.can_upload)
+
+    def is_admin(self):
+        return self.role == 'admin'
+
+    def can_manage_files(self):
+        return self.role == 'admin' or self.can_upload
+
+
+# Cache de permissões por processo: user_id -> (expira_em, geração, Principal)
+_principal_cache = {}
+_principal_lock = threading.Lock()
+
+# Geração compartilhada entre os workers: alterar um usuário em um worker
+# invalida as permissões em cache de todos (um stat() por consulta ao cache)
+principals_version = SharedCounter('principals')
+
+def busy_response():
+    """Resposta 503 quando o pool de hashing de senhas está saturado"""
+    response = jsonify({'error': 'Servidor ocupado. Tente novamente em instantes.'})
+    response.headers['Retry-After'] = '2'
+    return response, 503
+
+def get_current_user():
+    """Retorna o usuário logado, consultando o banco no máximo uma vez por requisição"""
+    if 'user_id' not in session:
+        return None
+    if '_current_user' not in g:
+        g._current_user = db.session.get(User, session['user_id'])
+    return g._current_user
+
+def get_current_principal():
+    """Retorna as permissões do usuário logado
+
+    Guardadas na requisição e, se PRINCIPAL_CACHE_TTL > 0, também no processo
+    pelo tempo configurado ou até a próxima alteração de um usuário em
+    qualquer worker (principals_version).
+    """
+    if 'user_id' not in session:
+        return None
+    if '_principal' in g:
+        return g._principal
+    
+    user_id = session['user_id']
+    ttl = current_app.config.get('PRINCIPAL_CACHE_TTL', 0)
+    now = time.monotonic()
+    
+    # Geração lida antes da consulta: uma alteração gravada entre as duas
+    # deixa a entrada já desatualizada para a próxima requisição
+    generation = principals_version.value() if ttl > 0 else None
+    cached = _principal_cache.get(user_id) if ttl > 0 else None
+    if cached and cached[0] > now and cached[1] == generation:
+        principal = cached[2]
+    else:
+        user = get_current_user()
+        principal = Principal.from_user(user) if user else None
+        if principal and ttl > 0:
+            with _principal_lock:
+                _principal_cache[user_id] = (now + ttl, generation, principal)
+    
+    g._principal = principal
+    return principal
+
+def invalidate_principal(user_id):
+    """Descarta permissões em cache após alterar papel ou permissões de um usuário
+
+    Chamar depois do commit. Com o cache ativo, os demais workers descartam
+    suas entradas ao ver a nova geração.
+    """
+    with _principal_lock:
+        _principal_cache.pop(user_id, None)
+    if current_app.config.get('PRINCIPAL_CACHE_TTL', 0) > 0:
+        principals_version.bump()
+    
+    if session.get('user_id') == user_id:
+        g.pop('_principal', None)
+        g.pop('_current_user', None)
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     """Endpoint para login"""
@@ -17,6 +107,11 @@ def login():
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
+            # Atualizar hashes gerados com parâmetros antigos
+            if user.needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+            
             session['user_id'] = user.id
             session['username'] = user.username
             session['role'] = user.role
@@ -27,6 +122,9 @@ def login():
         else:
             return jsonify({'error': 'Credenciais inválidas'}), 401
             
+    except HashingBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -44,7 +142,7 @@ def check_session():
     """Verifica se o usuário está logado"""
     try:
         if 'user_id' in session:
-            user = User.query.get(session['user_id'])
+            user = get_current_user()
             if user:
                 return jsonify({
                     'logged_in': True,
@@ -63,7 +161,7 @@ def register():
         if 'user_id' not in session:
             return jsonify({'error': 'Acesso negado. Faça login primeiro.'}), 401
         
-        current_user = User.query.get(session['user_id'])
+        current_user = get_current_principal()
         if not current_user or not current_user.is_admin():
             return jsonify({'error': 'Acesso negado. Apenas administradores podem cadastrar usuários.'}), 403
         
@@ -97,14 +195,15 @@ def register():
             'user': new_user.to_dict()
         }), 201
         
+    except HashingBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 def require_login(f):
     """Decorator para exigir login"""
-    from functools import wraps
-    
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
@@ -114,14 +213,12 @@ def require_login(f):
 
 def require_admin(f):
     """Decorator para exigir privilégios de admin"""
-    from functools import wraps
-    
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return jsonify({'error': 'Login necessário'}), 401
         
-        user = User.query.get(session['user_id'])
+        user = get_current_principal()
         if not user or not user.is_admin():
             return jsonify({'error': 'Acesso negado. Privilégios de administrador necessários.'}), 403
         
@@ -130,14 +227,12 @@ def require_admin(f):
 
 def require_upload_permission(f):
     """Decorator para exigir permissão de upload"""
-    from functools import wraps
-    
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session:
             return jsonify({'error': 'Login necessário'}), 401
         
-        user = User.query.get(session['user_id'])
+        user = get_current_principal()
         if not user or not user.can_manage_files():
             return jsonify({'error': 'Acesso negado. Permissão de upload necessária.'}), 403
         
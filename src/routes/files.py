@@ -1,9 +1,24 @@
-import os
-import uuid
-from flask import Blueprint, request, jsonify, session, send_from_directory, current_app
+from flask import Blueprint, request, jsonify, session, current_app
 from werkzeug.utils import secure_filename
-from src.models.user import db, File, User
+from src.models.user import db, File, User, Job
 from src.routes.auth import require_upload_permission, require_login
+from src.services.blobstore import stored_blob
+from src.services.file_index import file_index
+from src.services.ingest import InvalidContent, ingest_upload, close_after_rejection
+from src.services.media import send_media
+from src.services.pagination import encode_cursor, decode_cursor, parse_page_size, parse_bool, parse_int
+from src.services.events import event_stream
+from src.services.playlist import playlist_manifest, playlist_events, invalidate_playlist, preload_links
+from src.services.previews import read_preview_meta, preview_page_path
+from src.services.thumbnails import (
+    thumbnail_path, placeholder_svg, THUMBNAIL_CACHE_MAX_AGE, PLACEHOLDER_CACHE_MAX_AGE
+)
+from src.services.file_tasks import (
+    schedule_file_processing, schedule_file_removal, schedule_preview, schedule_thumbnail
+)
+from src.services.jobs import job_queue
+from src.services.settings import settings_cache
+from src.services.ordering import next_order_expression, bulk_set_order, spaced_orders, move_file
 
 files_bp = Blueprint('files', __name__)
 
@@ -44,6 +59,29 @@ def get_file_type(filename):
     
     return None
 
+def save_file_record(unique_filename, original_filename, file_type, file_path, display_time):
+    """Registra no banco um arquivo já gravado em disco e atualiza índice e playlist"""
+    # Salvar no banco de dados (posição no fim da playlist calculada no próprio INSERT)
+    new_file = File(
+        filename=unique_filename,
+        original_name=original_filename,
+        file_type=file_type,
+        file_path=file_path,
+        display_time=display_time,
+        upload_order=next_order_expression(),
+        uploaded_by=session['user_id']
+    )
+    
+    db.session.add(new_file)
+    db.session.flush()
+    
+    # Verificação, pré-visualização e miniatura ficam na fila de tarefas (mesmo commit)
+    schedule_file_processing(new_file)
+    db.session.commit()
+    file_index.add(unique_filename, file_path)
+    invalidate_playlist()
+    return new_file
+
 @files_bp.route('/upload', methods=['POST'])
 @require_upload_permission
 def upload_file():
@@ -64,52 +102,28 @@ def upload_file():
         if not allowed_file(file.filename, file_type):
             return jsonify({'error': f'Extensão não permitida para {file_type}'}), 400
         
-        # Gerar nome único para o arquivo
         original_filename = secure_filename(file.filename)
         file_extension = original_filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-        
-        # Determinar pasta de destino
-        if file_type == 'video':
-            subfolder = 'videos'
-        elif file_type == 'document':
-            subfolder = 'documents'
-        else:  # pdf
-            subfolder = 'pdfs'
-        
-        # Criar pasta se não existir
-        upload_folder = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder)
-        os.makedirs(upload_folder, exist_ok=True)
-        
-        # Salvar arquivo
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
         
         # Obter tempo de exibição do formulário
-        display_time = request.form.get('display_time', 10, type=int)
-        
-        # Obter próxima ordem
-        max_order = db.session.query(db.func.max(File.upload_order)).scalar() or 0
-        
-        # Salvar no banco de dados
-        new_file = File(
-            filename=unique_filename,
-            original_name=original_filename,
-            file_type=file_type,
-            file_path=file_path,
-            display_time=display_time,
-            upload_order=max_order + 1,
-            uploaded_by=session['user_id']
+        display_time = request.form.get(
+            'display_time', settings_cache.get_int('default_display_time', 10), type=int
         )
         
-        db.session.add(new_file)
-        db.session.commit()
+        # O arquivo já foi gravado, validado e hasheado durante a leitura da requisição
+        stream = ingest_upload(file)
+        
+        # Conteúdo idêntico já enviado antes é reaproveitado (deduplicação)
+        with stored_blob(stream.digest.hexdigest(), file_extension, stream.path) as (unique_filename, file_path):
+            new_file = save_file_record(unique_filename, original_filename, file_type, file_path, display_time)
         
         return jsonify({
             'message': 'Arquivo enviado com sucesso',
             'file': new_file.to_dict()
         }), 201
         
+    except InvalidContent as e:
+        return close_after_rejection(jsonify({'error': str(e)}))
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -117,22 +131,88 @@ def upload_file():
 @files_bp.route('/files', methods=['GET'])
 @require_login
 def get_files():
-    """Lista todos os arquivos"""
+    """Lista arquivos com paginação por cursor (upload_order, id) e filtros
+
+    Parâmetros: limit, cursor, file_type, is_active, uploaded_by, q (prefixo do
+    nome) e count=false para não calcular o total.
+    """
     try:
-        files = File.query.order_by(File.upload_order.asc()).all()
-        return jsonify([file.to_dict() for file in files]), 200
+        try:
+            limit = parse_page_size(request.args.get('limit'))
+            is_active = parse_bool(request.args.get('is_active'))
+            with_total = parse_bool(request.args.get('count', 'true'))
+            uploaded_by = parse_int(request.args.get('uploaded_by'))
+            cursor = request.args.get('cursor')
+            after = decode_cursor(cursor, 2) if cursor else None
+        except ValueError:
+            return jsonify({'error': 'Parâmetros de listagem inválidos'}), 400
+        
+        query = File.query_with_uploader()
+        
+        file_type = request.args.get('file_type')
+        if file_type:
+            query = query.filter(File.file_type == file_type)
+        
+        if is_active is not None:
+            query = query.filter(File.is_active.is_(is_active))
+        
+        if uploaded_by is not None:
+            query = query.filter(File.uploaded_by == uploaded_by)
+        
+        prefix = request.args.get('q')
+        if prefix:
+            query = query.filter(File.original_name.startswith(prefix, autoescape=True))
+        
+        total = query.order_by(None).count() if with_total else None
+        
+        if after is not None:
+            query = query.filter(db.tuple_(File.upload_order, File.id) > db.tuple_(*after))
+        
+        rows = query.order_by(File.upload_order.asc(), File.id.asc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        result = {
+            'files': [File.row_to_dict(row) for row in rows],
+            'next_cursor': encode_cursor(rows[-1].upload_order, rows[-1].id) if has_more else None
+        }
+        if total is not None:
+            result['total'] = total
+        
+        return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @files_bp.route('/files/active', methods=['GET'])
 def get_active_files():
-    """Lista arquivos ativos para exibição no dashboard"""
+    """Lista arquivos ativos para exibição no dashboard (com ETag/304)"""
     try:
-        files = File.query.filter_by(is_active=True).order_by(File.upload_order.asc()).all()
-        return jsonify([file.to_dict() for file in files]), 200
+        manifest = playlist_manifest.get()
+        if manifest.etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(manifest.body, mimetype='application/json')
+        
+        response.set_etag(manifest.etag)
+        response.cache_control.no_cache = True
+        for link in preload_links(manifest):
+            response.headers.add('Link', link)
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@files_bp.route('/files/events', methods=['GET'])
+def playlist_events_stream():
+    """Stream SSE com eventos de alteração da playlist para os displays"""
+    app = current_app._get_current_object()
+    response = current_app.response_class(
+        event_stream(playlist_events, app),
+        mimetype='text/event-stream'
+    )
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @files_bp.route('/files/<int:file_id>', methods=['GET'])
 @require_login
 def get_file(file_id):
@@ -161,6 +241,7 @@ def update_file(file_id):
             file.upload_order = data['upload_order']
         
         db.session.commit()
+        invalidate_playlist()
         return jsonify(file.to_dict()), 200
     except Exception as e:
         db.session.rollback()
@@ -173,13 +254,12 @@ def delete_file(file_id):
     try:
         file = File.query.get_or_404(file_id)
         
-        # Remover arquivo físico
-        if os.path.exists(file.file_path):
-            os.remove(file.file_path)
-        
-        # Remover do banco
+        # Remover do banco; arquivo físico e pré-visualizações são removidos
+        # pela fila de tarefas (se nenhum outro registro usar o mesmo conteúdo)
         db.session.delete(file)
+        schedule_file_removal(file)
         db.session.commit()
+        invalidate_playlist()
         
         return jsonify({'message': 'Arquivo removido com sucesso'}), 200
     except Exception as e:
@@ -194,6 +274,7 @@ def toggle_file_active(file_id):
         file = File.query.get_or_404(file_id)
         file.is_active = not file.is_active
         db.session.commit()
+        invalidate_playlist()
         
         return jsonify({
             'message': f'Arquivo {"ativado" if file.is_active else "desativado"} com sucesso',
@@ -203,39 +284,206 @@ def toggle_file_active(file_id):
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+def parse_file_id(value):
+    """Converte um id vindo do corpo JSON (ValueError se não for inteiro)"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(value)
+    return int(value)
+
+def parse_reorder(data):
+    """Interpreta ``file_ids`` ou ``file_orders`` em {file_id: upload_order} (ValueError se inválido)"""
+    if not isinstance(data, dict):
+        raise ValueError(data)
+    if 'file_ids' in data:
+        if not isinstance(data['file_ids'], list):
+            raise ValueError('file_ids')
+        return spaced_orders(parse_file_id(file_id) for file_id in data['file_ids'])
+    
+    items = data.get('file_orders', [])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise ValueError('file_orders')
+    return {
+        parse_file_id(item['id']): parse_file_id(item['order'])
+        for item in items
+        if item.get('id') is not None and item.get('order') is not None
+    }
+
 @files_bp.route('/files/reorder', methods=['POST'])
 @require_upload_permission
 def reorder_files():
-    """Reordena arquivos"""
+    """Reordena arquivos
+    
+    Aceita ``file_ids`` (ordem completa, posições espaçadas) ou ``file_orders``
+    (lista de {id, order}); aplicado com UPDATE ... CASE em lotes.
+    """
     try:
-        data = request.get_json()
-        file_orders = data.get('file_orders', [])
+        data = request.get_json() or {}
         
-        for item in file_orders:
-            file_id = item.get('id')
-            new_order = item.get('order')
-            
-            file = File.query.get(file_id)
-            if file:
-                file.upload_order = new_order
+        try:
+            orders = parse_reorder(data)
+        except ValueError:
+            return jsonify({'error': 'Ids ou posições inválidos'}), 400
         
+        bulk_set_order(orders)
         db.session.commit()
+        invalidate_playlist()
         return jsonify({'message': 'Ordem dos arquivos atualizada com sucesso'}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
+@files_bp.route('/files/<int:file_id>/move', methods=['POST'])
+@require_upload_permission
+def move_file_route(file_id):
+    """Move um arquivo para depois de ``after_id`` ou antes de ``before_id`` (sem ambos: início)"""
+    try:
+        file = db.session.get(File, file_id)
+        if file is None:
+            return jsonify({'error': 'Arquivo não encontrado'}), 404
+        
+        data = request.get_json() or {}
+        try:
+            if not isinstance(data, dict):
+                raise ValueError(data)
+            after_id = parse_file_id(data['after_id']) if data.get('after_id') is not None else None
+            before_id = parse_file_id(data['before_id']) if data.get('before_id') is not None else None
+        except ValueError:
+            return jsonify({'error': 'Arquivo de referência inválido'}), 400
+        if file_id in (after_id, before_id):
+            return jsonify({'error': 'Um arquivo não pode ser movido em relação a ele mesmo'}), 400
+        
+        try:
+            new_order = move_file(file, after_id=after_id, before_id=before_id)
+        except LookupError:
+            return jsonify({'error': 'Arquivo de referência não encontrado'}), 404
+        
+        db.session.commit()
+        invalidate_playlist()
+        return jsonify({'id': file_id, 'upload_order': new_order}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/jobs', methods=['GET'])
+@require_upload_permission
+def get_jobs():
+    """Lista as tarefas em segundo plano mais recentes e a contagem por estado"""
+    try:
+        query = Job.query
+        status = request.args.get('status')
+        if status:
+            query = query.filter(Job.status == status)
+        kind = request.args.get('kind')
+        if kind:
+            query = query.filter(Job.kind == kind)
+        
+        limit = parse_page_size(request.args.get('limit'))
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        counts = dict(db.session.query(Job.status, db.func.count(Job.id)).group_by(Job.status).all())
+        
+        return jsonify({'jobs': [job.to_dict() for job in jobs], 'counts': counts}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/jobs/<int:job_id>', methods=['GET'])
+@require_upload_permission
+def get_job(job_id):
+    """Estado de uma tarefa em segundo plano"""
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/jobs/<int:job_id>/retry', methods=['POST'])
+@require_upload_permission
+def retry_job(job_id):
+    """Recoloca na fila uma tarefa que falhou"""
+    try:
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({'error': 'Tarefa não encontrada'}), 404
+        if job.status != 'failed':
+            return jsonify({'error': 'Apenas tarefas com falha podem ser reexecutadas'}), 409
+        
+        job_queue.retry(job)
+        db.session.commit()
+        return jsonify(job.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/files/<int:file_id>/preview', methods=['GET'])
+def get_file_preview(file_id):
+    """Estado da pré-visualização de uma planilha (páginas, linhas e colunas)"""
+    try:
+        file = db.session.get(File, file_id)
+        if file is None or file.file_type != 'document':
+            return jsonify({'error': 'Arquivo não encontrado'}), 404
+        
+        meta = read_preview_meta(file.filename)
+        if meta is None:
+            # Ainda não gerada (ou gerada por outro worker que caiu): agendar aqui
+            schedule_preview(file)
+            db.session.commit()
+            return jsonify({'status': 'pending'}), 202
+        
+        response = jsonify(meta)
+        response.cache_control.no_cache = True
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/files/<int:file_id>/preview/<int:page>', methods=['GET'])
+def get_file_preview_page(file_id, page):
+    """Página pré-renderizada da planilha (linhas como listas de células)"""
+    try:
+        file = db.session.get(File, file_id)
+        if file is None or file.file_type != 'document':
+            return jsonify({'error': 'Arquivo não encontrado'}), 404
+        return send_media(preview_page_path(file.filename, page))
+    except FileNotFoundError:
+        return jsonify({'error': 'Página não encontrada'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@files_bp.route('/thumbnails/<path:filename>')
+def serve_thumbnail(filename):
+    """Miniatura do arquivo (primeira página do PDF ou quadro do vídeo) ou ícone substituto"""
+    try:
+        file_path = file_index.lookup(filename)
+        if file_path is None:
+            return jsonify({'error': 'Arquivo não encontrado'}), 404
+        
+        try:
+            return send_media(thumbnail_path(file_path), max_age=THUMBNAIL_CACHE_MAX_AGE, immutable=True)
+        except FileNotFoundError:
+            # Sem miniatura (ainda sendo gerada, sem ferramenta local ou arquivo anterior a ela)
+            file_type = get_file_type(filename)
+            schedule_thumbnail(filename, file_path, file_type)
+            db.session.commit()
+            response = current_app.response_class(placeholder_svg(file_type), mimetype='image/svg+xml')
+            response.cache_control.public = True
+            response.cache_control.max_age = PLACEHOLDER_CACHE_MAX_AGE
+            return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @files_bp.route('/serve/<path:filename>')
 def serve_file(filename):
-    """Serve arquivos estáticos"""
+    """Serve arquivos enviados com suporte a Range (streaming de vídeo)"""
     try:
-        # Procurar o arquivo nas subpastas
-        for subfolder in ['videos', 'documents', 'pdfs']:
-            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], subfolder)
-            if os.path.exists(os.path.join(file_path, filename)):
-                return send_from_directory(file_path, filename)
+        file_path = file_index.lookup(filename)
+        if file_path is None:
+            return jsonify({'error': 'Arquivo não encontrado'}), 404
         
-        return jsonify({'error': 'Arquivo não encontrado'}), 404
+        try:
+            return send_media(file_path)
+        except FileNotFoundError:
+            # Arquivo removido por outro worker: descartar entrada do índice
+            file_index.remove(filename)
+            return jsonify({'error': 'Arquivo não encontrado'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-
@@ -0,0 +1,46 @@
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db
+from src.routes.auth import require_admin
+from src.services.settings import settings_cache, InvalidSetting
+
+settings_bp = Blueprint('settings', __name__)
+
+def settings_response():
+    """Configurações tipadas com ETag pela versão (revalidação barata com 304)"""
+    etag = f'settings-{settings_cache.version}'
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(settings_cache.typed())
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+@settings_bp.route('/settings', methods=['GET'])
+def get_settings():
+    """Lista as configurações da aplicação (usadas também pelos displays)"""
+    try:
+        return settings_response()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@settings_bp.route('/settings', methods=['PUT'])
+@require_admin
+def update_settings():
+    """Atualiza configurações (apenas admin); os demais workers recarregam pela versão"""
+    try:
+        data = request.get_json()
+        if not isinstance(data, dict) or not data:
+            return jsonify({'error': 'Nenhuma configuração informada'}), 400
+        
+        settings_cache.update(data)
+        return settings_response()
+    except InvalidSetting as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except KeyError as e:
+        db.session.rollback()
+        return jsonify({'error': f'Configuração desconhecida: {e.args[0]}'}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,58 @@
+import hmac
+from flask import Blueprint, request, jsonify, current_app
+from src.models.user import db
+from src.routes.auth import require_admin
+from src.services.database import pool_stats
+from src.services.metrics import metrics
+from src.services.reconcile import reconcile_state, schedule_reconcile
+
+system_bp = Blueprint('system', __name__)
+
+@system_bp.route('/system/database', methods=['GET'])
+@require_admin
+def get_database_stats():
+    """Estado do pool de conexões deste worker (checkouts, esperas, conexões abertas)"""
+    try:
+        return jsonify({
+            'dialect': db.engine.dialect.name,
+            'pool': pool_stats.snapshot(db.engine),
+        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@system_bp.route('/system/storage', methods=['GET'])
+@require_admin
+def get_storage_reconcile():
+    """Estado da reconciliação do armazenamento (execução atual ou a última)"""
+    try:
+        return jsonify({'reconcile': reconcile_state()}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@system_bp.route('/system/storage/reconcile', methods=['POST'])
+@require_admin
+def start_storage_reconcile():
+    """Agenda a reconciliação na fila de tarefas (com "apply": quarentena e desativação)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        job = schedule_reconcile(bool(data.get('apply', False)))
+        db.session.commit()
+        return jsonify({'job': job.to_dict()}), 202
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@system_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas de todos os workers no formato de texto do Prometheus"""
+    if not metrics.enabled:
+        return jsonify({'error': 'Métricas desativadas (METRICS_ENABLED=1)'}), 404
+
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return jsonify({'error': 'Token de métricas inválido'}), 401
+
+    response = current_app.response_class(metrics.render(), mimetype='text/plain')
+    response.headers['Content-Type'] = 'text/plain; version=0.0.4; charset=utf-8'
+    response.cache_control.no_store = True
+    return response
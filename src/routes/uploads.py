@@ -0,0 +1,194 @@
+import re
+from flask import Blueprint, request, jsonify, session, current_app
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+from src.models.user import db
+from src.routes.auth import require_upload_permission
+from src.routes.files import get_file_type, allowed_file, save_file_record
+from src.services.partial_uploads import (
+    PartialUpload, UploadConflict, ChecksumMismatch, UploadTooLarge, parse_checksum_header
+)
+from src.services.blobstore import stored_blob
+from src.services.ingest import InvalidContent, close_after_rejection
+from src.services.settings import settings_cache
+
+uploads_bp = Blueprint('uploads', __name__)
+
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def get_own_upload(upload_id):
+    """Carrega um upload em andamento do usuário logado"""
+    upload = PartialUpload.load(upload_id)
+    if upload is None or upload.meta['user_id'] != session['user_id']:
+        return None
+    return upload
+
+def offset_response(upload, status=200):
+    """Resposta com o offset confirmado (também no cabeçalho Upload-Offset)"""
+    response = jsonify(upload.to_dict())
+    response.headers['Upload-Offset'] = str(upload.offset)
+    response.cache_control.no_store = True
+    return response, status
+
+@uploads_bp.route('/uploads', methods=['POST'])
+@require_upload_permission
+def init_upload():
+    """Inicia um upload em blocos (retomável)"""
+    try:
+        data = request.get_json() or {}
+        filename = data.get('filename') or ''
+        size = data.get('size')
+        
+        if not filename:
+            return jsonify({'error': 'Nenhum arquivo selecionado'}), 400
+        
+        if not isinstance(size, int) or size <= 0:
+            return jsonify({'error': 'Tamanho do arquivo inválido'}), 400
+        
+        if size > current_app.config['MAX_UPLOAD_SIZE']:
+            return jsonify({'error': 'Arquivo excede o tamanho máximo permitido'}), 413
+        
+        # Determinar tipo do arquivo
+        file_type = get_file_type(filename)
+        if not file_type:
+            return jsonify({'error': 'Tipo de arquivo não suportado'}), 400
+        
+        if not allowed_file(filename, file_type):
+            return jsonify({'error': f'Extensão não permitida para {file_type}'}), 400
+        
+        # Ausente ou 0 (campo vazio no formulário): tempo padrão das configurações
+        display_time = data.get('display_time') or settings_cache.get_int('default_display_time', 10)
+        if not isinstance(display_time, int) or isinstance(display_time, bool) or display_time < 0:
+            return jsonify({'error': 'Tempo de exibição inválido'}), 400
+        
+        original_filename = secure_filename(filename)
+        
+        # Conteúdo já armazenado (mesmo SHA-256): o arquivo é criado sem enviar nenhum byte
+        sha256 = (data.get('sha256') or '').lower()
+        if SHA256_PATTERN.match(sha256):
+            file_extension = original_filename.rsplit('.', 1)[1].lower()
+            with stored_blob(sha256, file_extension) as (unique_filename, file_path):
+                if file_path is not None:
+                    new_file = save_file_record(
+                        unique_filename, original_filename, file_type, file_path, display_time
+                    )
+                    return jsonify({
+                        'message': 'Arquivo enviado com sucesso',
+                        'complete': True,
+                        'file': new_file.to_dict(),
+                        'sha256': sha256
+                    }), 201
+        
+        upload = PartialUpload.create(
+            original_name=original_filename,
+            file_type=file_type,
+            size=size,
+            display_time=display_time,
+            user_id=session['user_id']
+        )
+        return offset_response(upload, 201)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['GET'])
+@require_upload_permission
+def get_upload(upload_id):
+    """Consulta o offset confirmado de um upload (para retomar)"""
+    try:
+        upload = get_own_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload não encontrado'}), 404
+        return offset_response(upload)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+@require_upload_permission
+def append_chunk(upload_id):
+    """Grava um bloco no offset informado em Upload-Offset
+
+    O corpo da requisição são os bytes do bloco. O cabeçalho opcional
+    ``Upload-Checksum: sha256 <base64>`` valida o bloco antes de confirmá-lo.
+    """
+    try:
+        upload = get_own_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload não encontrado'}), 404
+        
+        offset = request.headers.get('Upload-Offset', type=int)
+        if offset is None:
+            return jsonify({'error': 'Cabeçalho Upload-Offset obrigatório'}), 400
+        
+        checksum = parse_checksum_header(request.headers.get('Upload-Checksum'))
+        upload.append(request.stream, offset, checksum)
+        return offset_response(upload)
+    except UploadConflict as e:
+        response = jsonify({'error': str(e), 'offset': upload.offset})
+        response.headers['Upload-Offset'] = str(upload.offset)
+        return response, 409
+    except InvalidContent as e:
+        # Recusado nos primeiros bytes: o restante do bloco não é lido
+        return close_after_rejection(jsonify({'error': str(e), 'offset': upload.offset}))
+    except ChecksumMismatch as e:
+        return jsonify({'error': str(e), 'offset': upload.offset}), 400
+    except (UploadTooLarge, RequestEntityTooLarge):
+        return jsonify({'error': 'Bloco excede o tamanho permitido', 'offset': upload.offset}), 413
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@uploads_bp.route('/uploads/<upload_id>/complete', methods=['POST'])
+@require_upload_permission
+def complete_upload(upload_id):
+    """Finaliza o upload: confere tamanho e checksum e cria o registro do arquivo"""
+    try:
+        upload = get_own_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload não encontrado'}), 404
+        
+        if upload.offset != upload.size:
+            return offset_response(upload, 409)
+        
+        data = request.get_json(silent=True) or {}
+        checksum = upload.sha256()
+        expected = data.get('sha256')
+        if expected and expected.lower() != checksum:
+            # Os dados recebidos não são os do arquivo: retomar não os corrige
+            upload.discard()
+            return jsonify({'error': 'Checksum do arquivo não confere', 'sha256': checksum}), 422
+        
+        original_filename = upload.meta['original_name']
+        file_extension = original_filename.rsplit('.', 1)[1].lower()
+        
+        # Mover para o armazenamento por conteúdo (rename) ou descartar se já existir;
+        # se o registro não for gravado, o arquivo parcial volta ao lugar e a
+        # finalização pode ser repetida
+        with stored_blob(checksum, file_extension, upload.part_path,
+                         keep_source_on_error=True) as (unique_filename, file_path):
+            new_file = save_file_record(
+                unique_filename, original_filename, upload.meta['file_type'], file_path,
+                upload.meta['display_time']
+            )
+        upload.discard()
+        
+        return jsonify({
+            'message': 'Arquivo enviado com sucesso',
+            'file': new_file.to_dict(),
+            'sha256': checksum
+        }), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@uploads_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@require_upload_permission
+def cancel_upload(upload_id):
+    """Cancela um upload em andamento"""
+    try:
+        upload = get_own_upload(upload_id)
+        if upload is None:
+            return jsonify({'error': 'Upload não encontrado'}), 404
+        upload.discard()
+        return jsonify({'message': 'Upload cancelado'}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request, session
 from src.models.user import User, db
-from src.routes.auth import require_admin, require_login
+from src.routes.auth import require_admin, require_login, get_current_user, get_current_principal, invalidate_principal, busy_response
+from src.services.hashing import HashingBusy
+from src.services.playlist import invalidate_playlist
 
 user_bp = Blueprint('user', __name__)
 
@@ -20,11 +22,13 @@ def get_user(user_id):
     """Obtém dados de um usuário específico"""
     try:
         # Usuários podem ver apenas seus próprios dados, admin pode ver todos
-        current_user = User.query.get(session['user_id'])
-        if not current_user.is_admin() and current_user.id != user_id:
+        current_user = get_current_principal()
+        if not current_user or (not current_user.is_admin() and current_user.id != user_id):
             return jsonify({'error': 'Acesso negado'}), 403
         
-        user = User.query.get_or_404(user_id)
+        user = get_current_user() if current_user.id == user_id else User.query.get_or_404(user_id)
+        if user is None:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
         return jsonify(user.to_dict()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -55,7 +59,16 @@ def update_user(user_id):
             user.set_password(data['password'])
         
         db.session.commit()
+        invalidate_principal(user_id)
+        
+        # O nome do usuário aparece na playlist (uploader_name)
+        if 'username' in data:
+            invalidate_playlist()
+        
         return jsonify(user.to_dict()), 200
+    except HashingBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
@@ -68,12 +81,12 @@ def delete_user(user_id):
         user = User.query.get_or_404(user_id)
         
         # Não permitir deletar o próprio usuário admin
-        current_user = User.query.get(session['user_id'])
-        if user.id == current_user.id:
+        if user.id == session['user_id']:
             return jsonify({'error': 'Não é possível deletar seu próprio usuário'}), 400
         
         db.session.delete(user)
         db.session.commit()
+        invalidate_principal(user_id)
         return jsonify({'message': 'Usuário removido com sucesso'}), 200
     except Exception as e:
         db.session.rollback()
@@ -87,6 +100,7 @@ def toggle_upload_permission(user_id):
         user = User.query.get_or_404(user_id)
         user.can_upload = not user.can_upload
         db.session.commit()
+        invalidate_principal(user_id)
         
         return jsonify({
             'message': f'Permissão de upload {"ativada" if user.can_upload else "desativada"} para {user.username}',
@@ -101,7 +115,9 @@ def toggle_upload_permission(user_id):
 def get_profile():
     """Obtém perfil do usuário logado"""
     try:
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
+        if user is None:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
         return jsonify(user.to_dict()), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -111,7 +127,9 @@ def get_profile():
 def update_profile():
     """Atualiza perfil do usuário logado"""
     try:
-        user = User.query.get(session['user_id'])
+        user = get_current_user()
+        if user is None:
+            return jsonify({'error': 'Usuário não encontrado'}), 404
         data = request.json
         
         # Usuários podem alterar apenas sua própria senha
@@ -121,6 +139,9 @@ def update_profile():
             return jsonify({'message': 'Senha atualizada com sucesso'}), 200
         
         return jsonify({'error': 'Nenhum campo válido para atualização'}), 400
+    except HashingBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
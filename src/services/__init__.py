@@ -0,0 +1 @@
+# Serviços do Dashboard App
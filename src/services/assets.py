@@ -0,0 +1,177 @@
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:  # opcional: sem o pacote, apenas gzip
+    brotli = None
+
+# Arquivos com nome derivado do conteúdo nunca mudam na mesma URL
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+INDEX_FILE = 'index.html'
+
+# Tipos que valem a pena comprimir
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+# Referências a arquivos locais no index.html (src="..." e href="...")
+REFERENCE_PATTERN = re.compile(r'(\b(?:src|href)=")([^"]+)(")')
+
+ENCODINGS = ('br', 'gzip')
+
+
+class Asset:
+    """Arquivo estático em memória com suas variantes comprimidas"""
+
+    def __init__(self, name, data, mimetype):
+        self.name = name
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.variants = {'identity': data}
+        if mimetype.startswith(COMPRESSIBLE_TYPES):
+            compressed = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(data)
+            for encoding, body in compressed.items():
+                # Variantes que não reduzem o tamanho não são oferecidas
+                if len(body) < len(data):
+                    self.variants[encoding] = body
+
+    @property
+    def fingerprinted_name(self):
+        root, ext = os.path.splitext(self.name)
+        return f'{root}.{self.digest}{ext}'
+
+
+class StaticAssets:
+    """Frontend servido da memória, com nomes versionados e compressão prévia
+
+    Na inicialização, cada arquivo de ``static/`` é lido, recebe um nome com o
+    hash do conteúdo (``script.<hash>.js``) e tem variantes gzip/brotli
+    geradas uma única vez. O index.html passa a referenciar os nomes
+    versionados, que são servidos com cache imutável; só o index.html é
+    revalidado (ETag, 304). O fallback da SPA é decidido pelo conjunto de
+    caminhos em memória, sem acesso ao disco por requisição.
+    """
+
+    def __init__(self):
+        self.folder = None
+        self.assets = {}
+        self.fingerprinted = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.folder = app.static_folder
+        self.reload_on_change = app.debug
+        self.load()
+
+    def _scan(self):
+        """Arquivos da pasta estática: {caminho relativo: (tamanho, mtime)}"""
+        files = {}
+        for root, _, names in os.walk(self.folder):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                files[os.path.relpath(path, self.folder).replace(os.sep, '/')] = (stat.st_size, stat.st_mtime_ns)
+        return files
+
+    def load(self):
+        """Lê e comprime todos os arquivos estáticos"""
+        files = self._scan() if self.folder and os.path.isdir(self.folder) else {}
+        assets = {}
+        for name in files:
+            if name == INDEX_FILE:
+                continue
+            with open(os.path.join(self.folder, name), 'rb') as f:
+                assets[name] = Asset(name, f.read(), _guess_mimetype(name))
+
+        if INDEX_FILE in files:
+            with open(os.path.join(self.folder, INDEX_FILE), encoding='utf-8') as f:
+                html = _rewrite_references(f.read(), assets)
+            assets[INDEX_FILE] = Asset(INDEX_FILE, html.encode('utf-8'), 'text/html')
+
+        self.assets = assets
+        self.fingerprinted = {
+            asset.fingerprinted_name: asset for name, asset in assets.items() if name != INDEX_FILE
+        }
+        self._signature = files
+
+    def _reload_if_changed(self):
+        # Apenas em modo debug: permite editar o frontend sem reiniciar
+        with self._lock:
+            if self._scan() != self._signature:
+                self.load()
+
+    def resolve(self, path):
+        """Arquivo servido para um caminho da SPA (o index.html quando não há arquivo)"""
+        asset = self.fingerprinted.get(path)
+        if asset is None and path:
+            asset = self.assets.get(path)
+        return asset or self.assets.get(INDEX_FILE)
+
+    def response(self, path):
+        """Resposta para um caminho da SPA: arquivo versionado, arquivo estático ou index.html"""
+        if self.reload_on_change:
+            self._reload_if_changed()
+
+        asset = self.resolve(path)
+        if asset is None:
+            return current_app.response_class('index.html not found', status=404)
+        return self._send(asset, immutable=path in self.fingerprinted)
+
+    def _send(self, asset, immutable):
+        encoding = _negotiate(asset)
+        etag = asset.digest if encoding == 'identity' else f'{asset.digest}-{encoding}'
+
+        if etag in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.vary.add('Accept-Encoding')
+        if immutable:
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            # Nomes fixos (index.html e referências antigas): sempre revalidar
+            response.cache_control.no_cache = True
+        return response
+
+
+def _guess_mimetype(name):
+    mimetype, _ = mimetypes.guess_type(name)
+    return mimetype or 'application/octet-stream'
+
+
+def _negotiate(asset):
+    """Melhor codificação aceita pelo cliente entre as variantes disponíveis"""
+    accepted = request.accept_encodings
+    for encoding in ENCODINGS:
+        if encoding in asset.variants and accepted.quality(encoding) > 0:
+            return encoding
+    return 'identity'
+
+
+def _rewrite_references(html, assets):
+    """Troca as referências a arquivos locais pelos nomes versionados"""
+    def replace(match):
+        name = match.group(2)
+        local = name[2:] if name.startswith('./') else name.lstrip('/')
+        asset = assets.get(local)
+        if asset is None:
+            return match.group(0)
+        return f'{match.group(1)}/{asset.fingerprinted_name}{match.group(3)}'
+    return REFERENCE_PATTERN.sub(replace, html)
+
+
+static_assets = StaticAssets()
@@ -0,0 +1,141 @@
+import os
+import uuid
+import hashlib
+from contextlib import contextmanager
+from src.models.user import db, File
+from src.services.file_index import file_index
+from src.services.locks import file_lock
+from src.services.previews import discard_preview
+from src.services.storage import blob_folder, blob_path, blob_digest
+from src.services.thumbnails import discard_thumbnail
+
+# Buffer de cópia ao gravar blobs
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+class BlobWriter:
+    """Grava um upload em arquivo temporário calculando SHA-256 e tamanho na mesma passada
+
+    O temporário fica dentro de ``blobs/tmp``, no mesmo sistema de arquivos dos
+    blobs, para que a gravação definitiva seja apenas um rename.
+    """
+
+    def __init__(self):
+        tmp_folder = os.path.join(blob_folder(), 'tmp')
+        os.makedirs(tmp_folder, exist_ok=True)
+        self.path = os.path.join(tmp_folder, f'{uuid.uuid4().hex}.tmp')
+        self.file = open(self.path, 'w+b')
+        self.digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.digest.update(data)
+        self.size += len(data)
+        return self.file.write(data)
+
+    def copy_from(self, stream):
+        """Copia um stream inteiro em blocos de tamanho limitado"""
+        for data in iter(lambda: stream.read(COPY_BUFFER_SIZE), b''):
+            self.write(data)
+
+    def close(self):
+        """Fecha o temporário e retorna o SHA-256 hexadecimal do conteúdo"""
+        if not self.file.closed:
+            self.file.close()
+        return self.digest.hexdigest()
+
+    def abort(self):
+        """Descarta o temporário"""
+        self.file.close()
+        _remove(self.path)
+
+
+def file_sha256(path):
+    """Calcula o SHA-256 de um arquivo em disco"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for data in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(data)
+    return digest.hexdigest()
+
+
+def _lock_path(digest):
+    return os.path.join(blob_folder(), digest[:2], '.lock')
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def stored_blob(digest, extension, source_path=None, keep_source_on_error=False):
+    """Guarda um conteúdo no armazenamento por conteúdo e fornece (filename, caminho)
+
+    Se o blob já existir, ``source_path`` é descartado (deduplicação); se não
+    existir e não houver ``source_path``, fornece (filename, None). O lock do
+    blob fica preso até o fim do bloco ``with``, onde o registro File deve ser
+    criado: assim uma remoção concorrente não apaga um blob que acabou de
+    ganhar uma nova referência.
+
+    Com ``keep_source_on_error``, se o bloco falhar ``source_path`` continua
+    existindo (o blob criado a partir dele volta para a origem), para que a
+    operação possa ser repetida; sem ele, o conteúdo é descartado.
+    """
+    filename = f'{digest}.{extension}'
+    path = blob_path(filename)
+
+    with file_lock(_lock_path(digest)):
+        created = False
+        if os.path.exists(path):
+            if source_path is not None and not keep_source_on_error:
+                _remove(source_path)
+        elif source_path is not None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(source_path, path)
+            created = True
+        else:
+            path = None
+
+        try:
+            yield filename, path
+        except Exception:
+            # Registro não foi criado: não deixar blob novo sem referência
+            if created and keep_source_on_error:
+                os.replace(path, source_path)
+            elif created:
+                _remove(path)
+            raise
+
+        if source_path is not None and not created and keep_source_on_error:
+            _remove(source_path)
+
+
+def release_file(filename, file_path):
+    """Remove o arquivo do disco se nenhum registro File ainda o referenciar
+
+    Chamar após o commit da remoção do registro. A contagem de referências é
+    a quantidade de linhas de File com o mesmo filename.
+    """
+    with blob_lock(filename):
+        references = db.session.query(File.id).filter(File.filename == filename).count()
+        if references == 0:
+            _remove(file_path)
+            discard_thumbnail(file_path)
+            discard_preview(filename)
+            file_index.remove(filename)
+            return True
+    return False
+
+
+def blob_lock(filename):
+    """Lock do blob (o mesmo de stored_blob); arquivos com nomes antigos não têm lock"""
+    digest = blob_digest(filename)
+    return file_lock(_lock_path(digest)) if digest else _no_lock()
+
+
+@contextmanager
+def _no_lock():
+    yield
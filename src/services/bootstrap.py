@@ -0,0 +1,41 @@
+import os
+from flask import current_app
+from src.models.user import db, User
+from src.models.schema import ensure_indexes
+from src.services.locks import file_lock
+from src.services.schema_stamp import write_stamp
+from src.services.settings import create_default_settings
+
+
+def create_admin_user():
+    """Cria o usuário admin padrão se não existir"""
+    admin = User.query.filter_by(username='Admin').first()
+    if not admin:
+        admin = User(
+            username='Admin',
+            role='admin',
+            can_upload=True
+        )
+        admin.set_password('Admin')
+        db.session.add(admin)
+        db.session.commit()
+        print("Usuário admin criado: Admin/Admin")
+
+
+def initialize_database():
+    """Cria tabelas, índices e dados iniciais que ainda não existem
+
+    Idempotente e executada uma vez por inicialização (comando init-db,
+    chamado pelo gunicorn antes de criar os workers), nunca na importação do
+    app. O lock impede que duas execuções simultâneas disputem o seed, e o
+    carimbo gravado ao final permite que as próximas partidas pulem o passo
+    enquanto o esquema não mudar. Retorna os índices criados.
+    """
+    state_folder = current_app.config['STATE_FOLDER']
+    with file_lock(os.path.join(state_folder, 'init-db.lock')):
+        db.create_all()
+        created = ensure_indexes()
+        create_admin_user()
+        create_default_settings()
+        write_stamp(state_folder)
+    return created
@@ -0,0 +1,155 @@
+import os
+import time
+import threading
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+from src.services.server import worker_class, cooperative_database
+
+# Conexões por processo conforme o tipo de worker do gunicorn (somadas às
+# threads da fila de tarefas). Com gevent e o psycopg2 cooperativo
+# (psycogreen), vários greenlets consultam o banco ao mesmo tempo em um único
+# processo; sem ele, as consultas são serializadas e o pool segue o gthread.
+GEVENT_POOL_SIZE = 10
+
+SQLITE_SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+
+# Esperas por conexão acima disso contam como espera (segundos)
+SLOW_CHECKOUT = 0.01
+
+
+def default_pool_size(config):
+    """Tamanho do pool para o tipo de worker configurado (GUNICORN_WORKER_CLASS)"""
+    kind = worker_class()
+    job_workers = max(config.get('JOB_WORKERS', 0), 0)
+    if kind == 'gevent' and cooperative_database():
+        return GEVENT_POOL_SIZE + job_workers
+    if kind in ('gevent', 'gthread'):
+        return int(os.environ.get('GUNICORN_THREADS', 8)) + job_workers
+    return 1 + job_workers
+
+
+def engine_options(config):
+    """Opções do engine (SQLALCHEMY_ENGINE_OPTIONS) a partir da configuração do app
+
+    Pool com tamanho fixo (sem abrir e fechar conexões a cada pico), pre-ping
+    e reciclagem para conexões derrubadas pelo servidor, e timeout por
+    comando no PostgreSQL. No SQLite, o busy timeout faz os escritores
+    concorrentes esperarem o lock em vez de falhar com "database is locked".
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        options = {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT'] / 1000}}
+        if uri in ('sqlite://', 'sqlite:///:memory:'):
+            # Banco em memória: o SQLAlchemy usa um pool próprio
+            return options
+    else:
+        options = {'pool_pre_ping': True, 'pool_recycle': config['DB_POOL_RECYCLE']}
+        if config['DB_STATEMENT_TIMEOUT'] > 0 and uri.startswith('postgresql'):
+            options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT']}"}
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=config['DB_POOL_SIZE'] or default_pool_size(config),
+        max_overflow=config['DB_MAX_OVERFLOW'],
+        pool_timeout=config['DB_POOL_TIMEOUT'],
+    )
+    return options
+
+
+class PoolStats:
+    """Contadores do pool de conexões deste processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+
+    def record_checkout(self, seconds, timed_out=False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if seconds >= SLOW_CHECKOUT:
+                self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self, engine=None):
+        """Contadores acumulados e, com ``engine``, o estado atual do pool"""
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.wait_seconds, 6),
+                'max_wait_seconds': round(self.max_wait_seconds, 6),
+                'connects': self.connects,
+                'closes': self.closes,
+                'invalidations': self.invalidations,
+            }
+        pool = engine.pool if engine is not None else None
+        if isinstance(pool, QueuePool):
+            data.update(
+                size=pool.size(),
+                checked_out=pool.checkedout(),
+                checked_in=pool.checkedin(),
+                overflow=max(pool.overflow(), 0),
+                timeout=pool.timeout(),
+            )
+        return data
+
+
+pool_stats = PoolStats()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool que mede o tempo de espera por uma conexão livre
+
+    Inclui a abertura de conexões novas quando o pool ainda não está cheio.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_stats.record_checkout(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record_checkout(time.perf_counter() - started)
+        return connection
+
+
+def init_engine(app, engine):
+    """Registra os eventos do engine: contadores do pool e PRAGMAs do SQLite"""
+    event.listen(engine, 'connect', lambda *args: pool_stats.increment('connects'))
+    event.listen(engine, 'close', lambda *args: pool_stats.increment('closes'))
+    event.listen(engine, 'invalidate', lambda *args: pool_stats.increment('invalidations'))
+
+    if engine.dialect.name != 'sqlite':
+        return
+
+    synchronous = app.config['SQLITE_SYNCHRONOUS'].upper()
+    if synchronous not in SQLITE_SYNCHRONOUS_LEVELS:
+        raise ValueError(f'SQLITE_SYNCHRONOUS inválido: {synchronous}')
+    busy_timeout = int(app.config['SQLITE_BUSY_TIMEOUT'])
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL: leitores não bloqueiam o escritor (e vice-versa); com NORMAL o
+        # commit não espera um fsync por transação
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout={busy_timeout}')
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute(f'PRAGMA synchronous={synchronous}')
+        cursor.close()
@@ -0,0 +1,133 @@
+import json
+import queue
+import threading
+import time
+from src.services.hashing import _gevent_active
+from src.services.metrics import metrics
+
+# Intervalo de verificação da versão da playlist (segundos)
+POLL_INTERVAL = 1.0
+
+# Intervalo entre comentários de keep-alive enviados aos clientes (segundos)
+HEARTBEAT_INTERVAL = 15.0
+
+# Tempo de espera do navegador antes de reconectar (milissegundos)
+RETRY_INTERVAL_MS = 5000
+
+# Eventos pendentes por conexão; acima disso os mais novos são descartados
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+class PlaylistEventHub:
+    """Distribui eventos de alteração (playlist, configurações) para as conexões SSE do worker
+
+    Um único watcher por processo observa as versões compartilhadas
+    (alterações feitas por qualquer worker) e repassa um evento por mudança,
+    com o nome do contador, para a fila de cada conexão. Sem conexões
+    abertas, o watcher termina.
+    """
+
+    def __init__(self, counters, poll_interval=POLL_INTERVAL):
+        self.counters = counters
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._watcher = None
+        self._last_versions = {}
+
+    def subscribe(self, app):
+        """Registra uma nova conexão e retorna sua fila de eventos"""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._watcher is None or not self._watcher.is_alive():
+                self._watcher = threading.Thread(target=self._watch, args=(app,), daemon=True)
+                self._watcher.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove uma conexão encerrada"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def versions(self):
+        """Versão atual de cada contador observado"""
+        return {name: counter.value() for name, counter in self.counters.items()}
+
+    def publish(self, name, version):
+        """Envia o evento de nova versão para todas as conexões (uma vez por versão)"""
+        with self._lock:
+            last_version = self._last_versions.get(name)
+            if last_version is not None and version <= last_version:
+                return
+            self._last_versions[name] = version
+            subscribers = list(self._subscribers)
+
+        event = (name, {'version': version})
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                # Cliente lento: ele já tem eventos pendentes e vai recarregar a playlist
+                pass
+
+    def _watch(self, app):
+        with app.app_context():
+            self._last_versions.update(self.versions())
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        self._watcher = None
+                        return
+                for name, version in self.versions().items():
+                    self.publish(name, version)
+                time.sleep(self.poll_interval)
+
+
+def format_event(name, data):
+    """Formata um evento no protocolo text/event-stream"""
+    return f'event: {name}\ndata: {json.dumps(data)}\n\n'
+
+
+def streams_are_cooperative():
+    """Indica se uma conexão aberta indefinidamente não prende uma thread do worker"""
+    return _gevent_active()
+
+
+def event_stream(hub, app, heartbeat=HEARTBEAT_INTERVAL, persistent=None):
+    """Gera o stream SSE de uma conexão, com keep-alive periódico
+
+    Em workers com threads (gthread), uma conexão aberta ocuparia uma thread
+    enquanto o display estiver ligado, e poucos displays travariam o worker.
+    Nesse caso o stream envia só o evento ``hello`` com as versões atuais e
+    termina: o EventSource reconecta após ``retry`` e o cliente compara as
+    versões (polling barato, sem consulta ao banco).
+    """
+    if persistent is None:
+        persistent = streams_are_cooperative()
+    if not persistent:
+        yield f'retry: {RETRY_INTERVAL_MS}\n'
+        with app.app_context():
+            yield format_event('hello', hub.versions())
+        return
+
+    subscriber = hub.subscribe(app)
+    metrics.stream_opened('events')
+    try:
+        yield f'retry: {RETRY_INTERVAL_MS}\n'
+        with app.app_context():
+            yield format_event('hello', hub.versions())
+
+        while True:
+            try:
+                name, data = subscriber.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_event(name, data)
+    finally:
+        metrics.stream_closed('events')
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,209 @@
+import struct
+from bisect import bisect_right
+
+# Reescrita "fast start" de MP4: move o atom moov (índice das amostras) para
+# antes do mdat, ajustando os offsets de chunk (stco/co64). Sem o índice no
+# início, o navegador precisa baixar o arquivo quase inteiro antes do primeiro
+# quadro.
+
+# Atoms no caminho moov > trak > mdia > minf > stbl, onde ficam stco/co64
+PATH_CONTAINERS = {b'trak', b'mdia', b'minf', b'stbl'}
+
+# Limite do moov carregado em memória (o índice costuma ter poucos MB)
+MAX_MOOV_SIZE = 64 * 1024 * 1024
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+UINT32_MAX = 0xFFFFFFFF
+
+
+class InvalidMp4(Exception):
+    """Estrutura de atoms do MP4 inválida ou truncada"""
+
+
+def top_level_atoms(f):
+    """Lista os atoms de primeiro nível: [(tipo, offset, tamanho)]"""
+    f.seek(0, 2)
+    file_size = f.tell()
+    atoms = []
+    offset = 0
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(16)
+        size, kind = struct.unpack('>I4s', header[:8])
+        if size == 1:
+            if len(header) < 16:
+                raise InvalidMp4('Cabeçalho de atom truncado')
+            size = struct.unpack('>Q', header[8:16])[0]
+        elif size == 0:
+            size = file_size - offset
+        if size < 8 or offset + size > file_size:
+            raise InvalidMp4(f'Atom {kind!r} com tamanho inválido')
+        atoms.append((kind, offset, size))
+        offset += size
+    return atoms
+
+
+def _moov_position(atoms):
+    """Índices do moov e do primeiro mdat quando o moov está depois dos dados"""
+    kinds = [kind for kind, _, _ in atoms]
+    if b'moov' not in kinds or b'mdat' not in kinds or b'moof' in kinds:
+        # Sem índice, sem dados ou MP4 fragmentado: nada a fazer
+        return None
+    moov_index = kinds.index(b'moov')
+    mdat_index = kinds.index(b'mdat')
+    if moov_index < mdat_index:
+        return None
+    return moov_index, mdat_index
+
+
+def needs_faststart(path):
+    """Indica se o MP4 tem o moov depois do mdat (e pode ser reescrito)"""
+    with open(path, 'rb') as f:
+        try:
+            atoms = top_level_atoms(f)
+        except InvalidMp4:
+            return False
+    position = _moov_position(atoms)
+    if position is None:
+        return False
+    _, _, moov_size = atoms[position[0]]
+    return moov_size <= MAX_MOOV_SIZE
+
+
+def _iter_boxes(data):
+    offset = 0
+    while offset < len(data):
+        if offset + 8 > len(data):
+            raise InvalidMp4('Atom truncado no moov')
+        size, kind = struct.unpack_from('>I4s', data, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = len(data) - offset
+        if size < header or offset + size > len(data):
+            raise InvalidMp4(f'Atom {kind!r} com tamanho inválido no moov')
+        yield kind, data[offset + header:offset + size], data[offset:offset + size]
+        offset += size
+
+
+def _box(kind, body):
+    if len(body) + 8 > UINT32_MAX:
+        return struct.pack('>I4sQ', 1, kind, len(body) + 16) + body
+    return struct.pack('>I4s', len(body) + 8, kind) + body
+
+
+def _chunk_offsets(kind, body):
+    if len(body) < 8:
+        raise InvalidMp4(f'{kind.decode()} truncado')
+    count = struct.unpack_from('>I', body, 4)[0]
+    width = 'I' if kind == b'stco' else 'Q'
+    if len(body) < 8 + count * struct.calcsize(f'>{width}'):
+        raise InvalidMp4(f'{kind.decode()} truncado')
+    return body[:4], struct.unpack_from(f'>{count}{width}', body, 8)
+
+
+def _rewrite(data, relocate, use_co64):
+    """Reescreve uma sequência de atoms aplicando ``relocate`` aos offsets de chunk
+
+    Retorna (bytes, overflow); ``overflow`` indica que algum offset não cabe
+    em stco (32 bits) e a reescrita deve ser refeita com co64.
+    """
+    output = []
+    overflow = False
+    for kind, body, raw in _iter_boxes(data):
+        if kind in PATH_CONTAINERS:
+            body, child_overflow = _rewrite(body, relocate, use_co64)
+            overflow = overflow or child_overflow
+            output.append(_box(kind, body))
+        elif kind in (b'stco', b'co64'):
+            version_flags, offsets = _chunk_offsets(kind, body)
+            offsets = [relocate(offset) for offset in offsets]
+            if kind == b'co64' or use_co64:
+                output.append(_box(b'co64', version_flags + struct.pack(f'>I{len(offsets)}Q', len(offsets), *offsets)))
+            else:
+                if offsets and max(offsets) > UINT32_MAX:
+                    overflow = True
+                    offsets = [0] * len(offsets)
+                output.append(_box(b'stco', version_flags + struct.pack(f'>I{len(offsets)}I', len(offsets), *offsets)))
+        else:
+            output.append(raw)
+    return b''.join(output), overflow
+
+
+def _layout(atoms, moov_index, mdat_index, moov_size):
+    """Ordem dos atoms no arquivo reescrito e função que converte offsets antigos em novos"""
+    order = atoms[:mdat_index] + [None] + [atom for i, atom in enumerate(atoms[mdat_index:], mdat_index)
+                                           if i != moov_index]
+    starts, deltas = [], []
+    position = 0
+    for atom in order:
+        if atom is None:
+            position += moov_size
+            continue
+        _, offset, size = atom
+        starts.append(offset)
+        deltas.append(position - offset)
+        position += size
+
+    ranges = sorted(zip(starts, deltas))
+    range_starts = [start for start, _ in ranges]
+
+    def relocate(offset):
+        index = bisect_right(range_starts, offset) - 1
+        if index < 0:
+            raise InvalidMp4('Offset de chunk fora dos dados')
+        return offset + ranges[index][1]
+    return order, relocate
+
+
+def write_faststart(path, output):
+    """Grava em ``output`` (objeto com write) o MP4 com o moov antes do mdat
+
+    Apenas o moov é carregado em memória; os demais atoms são copiados em
+    blocos. Levanta InvalidMp4 se o arquivo não puder ser reescrito.
+    """
+    with open(path, 'rb') as f:
+        atoms = top_level_atoms(f)
+        position = _moov_position(atoms)
+        if position is None:
+            raise InvalidMp4('O moov já está no início do arquivo')
+        moov_index, mdat_index = position
+        _, moov_offset, moov_size = atoms[moov_index]
+        if moov_size > MAX_MOOV_SIZE:
+            raise InvalidMp4('moov grande demais para ser reescrito')
+
+        f.seek(moov_offset)
+        moov_data = f.read(moov_size)
+        _, moov_body, _ = next(_iter_boxes(moov_data))
+        if any(kind == b'cmov' for kind, _, _ in _iter_boxes(moov_body)):
+            raise InvalidMp4('moov comprimido (cmov) não é suportado')
+
+        # O tamanho do novo moov não depende dos valores dos offsets, só do
+        # formato (stco/co64): calcula com deslocamento zero e refaz com o real
+        use_co64 = False
+        for _ in range(2):
+            body, _ = _rewrite(moov_body, lambda offset: offset, use_co64)
+            new_size = len(_box(b'moov', body))
+            order, relocate = _layout(atoms, moov_index, mdat_index, new_size)
+            body, overflow = _rewrite(moov_body, relocate, use_co64)
+            if not overflow:
+                break
+            use_co64 = True
+        new_moov = _box(b'moov', body)
+
+        for atom in order:
+            if atom is None:
+                output.write(new_moov)
+                continue
+            _, offset, size = atom
+            f.seek(offset)
+            remaining = size
+            while remaining > 0:
+                data = f.read(min(COPY_BUFFER_SIZE, remaining))
+                if not data:
+                    raise InvalidMp4('Arquivo truncado')
+                output.write(data)
+                remaining -= len(data)
@@ -0,0 +1,78 @@
+import threading
+import time
+from src.models.user import db, File
+from src.services.storage import storage_path
+
+
+# Nomes não encontrados lembrados por processo (a lista é descartada ao encher)
+MAX_MISSES = 1024
+
+
+class FileIndex:
+    """Índice em memória filename -> caminho em disco dos arquivos enviados
+
+    Evita sondar as subpastas a cada requisição de /api/serve. É carregado a
+    partir da tabela File e mantido pelas rotas de upload/remoção. Um nome
+    ausente (enviado por outro worker, por exemplo) é buscado no banco pela
+    linha única (índice ix_file_filename) e acrescentado ao índice; só os
+    nomes que também não existem no banco ficam em cache negativo por
+    ``miss_ttl`` segundos, para que 404s repetidos não consultem o banco.
+    """
+
+    def __init__(self, miss_ttl=5.0):
+        self.miss_ttl = miss_ttl
+        self._paths = {}
+        self._misses = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def rebuild(self):
+        """Recarrega o índice a partir do banco de dados"""
+        rows = db.session.query(File.filename, File.file_type).all()
+        paths = {filename: storage_path(file_type, filename) for filename, file_type in rows}
+        with self._lock:
+            self._paths = paths
+            self._misses = {}
+            self._loaded = True
+
+    def add(self, filename, path):
+        """Registra um arquivo no índice"""
+        with self._lock:
+            self._paths[filename] = path
+            self._misses.pop(filename, None)
+
+    def remove(self, filename):
+        """Remove um arquivo do índice"""
+        with self._lock:
+            self._paths.pop(filename, None)
+
+    def lookup(self, filename):
+        """Retorna o caminho do arquivo ou None se ele não existir"""
+        path = self._paths.get(filename)
+        if path is not None:
+            return path
+
+        if not self._loaded:
+            self.rebuild()
+            return self._paths.get(filename)
+
+        now = time.monotonic()
+        with self._lock:
+            missed_at = self._misses.get(filename)
+        if missed_at is not None and now - missed_at < self.miss_ttl:
+            return None
+
+        row = db.session.query(File.file_type).filter(File.filename == filename).first()
+        if row is None:
+            with self._lock:
+                if len(self._misses) >= MAX_MISSES:
+                    self._misses.clear()
+                self._misses[filename] = now
+            return None
+
+        path = storage_path(row.file_type, filename)
+        self.add(filename, path)
+        return path
+
+
+file_index = FileIndex()
@@ -0,0 +1,144 @@
+import os
+from src.models.user import db, File
+from src.services.blobstore import BlobWriter, stored_blob, release_file, file_sha256
+from src.services.faststart import needs_faststart, write_faststart
+from src.services.file_index import file_index
+from src.services.jobs import job_queue, job_handler, run_blocking
+from src.services.playlist import invalidate_playlist
+from src.services.previews import preview_folder, render_preview
+from src.services.storage import blob_digest
+from src.services.thumbnails import generate_thumbnail, needs_thumbnail
+
+
+class StoredChecksumMismatch(Exception):
+    """Conteúdo gravado em disco não corresponde ao SHA-256 do nome do blob"""
+
+
+def _extension(filename):
+    return filename.rsplit('.', 1)[1].lower()
+
+
+def schedule_file_processing(file):
+    """Agenda o trabalho pós-upload: verificação do conteúdo, pré-visualização e miniatura
+
+    Chamar antes do commit que grava o arquivo (o id já deve existir, após flush).
+    """
+    job_queue.enqueue(
+        'verify_checksum',
+        {'filename': file.filename, 'file_path': file.file_path},
+        key=f'verify:{file.filename}'
+    )
+    if file.file_type == 'document':
+        schedule_preview(file)
+    elif file.file_type == 'video' and _extension(file.filename) == 'mp4':
+        # A miniatura é agendada ao fim da tarefa, já para o arquivo reescrito
+        schedule_faststart(file.filename, file.file_path)
+    else:
+        schedule_thumbnail(file.filename, file.file_path, file.file_type)
+
+
+def schedule_preview(file):
+    job_queue.enqueue(
+        'render_preview',
+        {
+            'file_path': file.file_path,
+            'extension': _extension(file.filename),
+            'source': file.filename
+        },
+        key=f'preview:{file.filename}'
+    )
+
+
+def schedule_thumbnail(filename, file_path, file_type):
+    if not needs_thumbnail(file_path, file_type):
+        return
+    job_queue.enqueue(
+        'generate_thumbnail',
+        {'file_path': file_path, 'file_type': file_type},
+        key=f'thumbnail:{filename}'
+    )
+
+
+def schedule_faststart(filename, file_path):
+    job_queue.enqueue(
+        'faststart_video',
+        {'filename': filename, 'file_path': file_path},
+        key=f'faststart:{filename}'
+    )
+
+
+def schedule_file_removal(file):
+    """Agenda a remoção dos dados em disco de um registro excluído (no mesmo commit)"""
+    job_queue.enqueue(
+        'remove_file',
+        {'file_id': file.id, 'filename': file.filename, 'file_path': file.file_path}
+    )
+
+
+@job_handler('remove_file')
+def remove_file_task(payload):
+    # O blob e a pré-visualização só são apagados se nenhum outro registro
+    # ainda referenciar o arquivo
+    release_file(payload['filename'], payload['file_path'])
+
+
+@job_handler('verify_checksum')
+def verify_checksum_task(payload):
+    digest = blob_digest(payload['filename'])
+    if digest is None or not os.path.exists(payload['file_path']):
+        return
+    actual = run_blocking(file_sha256, payload['file_path'])
+    if actual != digest:
+        raise StoredChecksumMismatch(f'{payload["filename"]}: SHA-256 em disco é {actual}')
+
+
+@job_handler('render_preview')
+def render_preview_task(payload):
+    folder = preview_folder(payload['source'])
+    run_blocking(render_preview, folder, payload['file_path'], payload['extension'], payload['source'])
+
+
+@job_handler('generate_thumbnail')
+def generate_thumbnail_task(payload):
+    run_blocking(generate_thumbnail, payload['file_path'], payload['file_type'])
+
+
+def _write_faststart_blob(file_path):
+    writer = BlobWriter()
+    try:
+        write_faststart(file_path, writer)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.path, writer.close()
+
+
+@job_handler('faststart_video')
+def faststart_video_task(payload):
+    """Reescreve um MP4 com o moov no início e aponta os registros para o novo blob
+
+    O conteúdo reescrito tem outro SHA-256, então vira um blob novo; o antigo
+    é liberado quando deixa de ser referenciado.
+    """
+    filename, file_path = payload['filename'], payload['file_path']
+    if not os.path.exists(file_path) or not run_blocking(needs_faststart, file_path):
+        schedule_thumbnail(filename, file_path, 'video')
+        db.session.commit()
+        return
+
+    tmp_path, digest = run_blocking(_write_faststart_blob, file_path)
+    with stored_blob(digest, _extension(filename), tmp_path) as (new_filename, new_path):
+        updated = File.query.filter(File.filename == filename).update(
+            {'filename': new_filename, 'file_path': new_path}, synchronize_session=False
+        )
+        if updated:
+            schedule_thumbnail(new_filename, new_path, 'video')
+        db.session.commit()
+
+    if updated:
+        file_index.add(new_filename, new_path)
+        invalidate_playlist()
+    else:
+        # Arquivo excluído durante a reescrita
+        release_file(new_filename, new_path)
+    release_file(filename, file_path)
@@ -0,0 +1,108 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Parâmetros padrão (sobrescritos pela configuração do app em init_app)
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256:600000'
+DEFAULT_SALT_LENGTH = 16
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_QUEUE_TIMEOUT = 5.0
+
+
+class HashingBusy(Exception):
+    """Fila de hashing de senhas cheia; o cliente deve tentar novamente"""
+
+
+def _gevent_active():
+    """Verifica se o processo roda com gevent (threading substituído por greenlets)"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('threading')
+
+
+class PasswordHasher:
+    """Executa hash e verificação de senhas fora da thread da requisição
+
+    O PBKDF2 libera o GIL, então um pool pequeno de threads do sistema faz o
+    trabalho em paralelo sem bloquear o loop do gevent nem os demais
+    greenlets/threads do worker. O número de operações em andamento e na fila
+    é limitado: acima disso a requisição espera até ``queue_timeout`` e então
+    recebe HashingBusy (503). Com ``workers = 0`` o hash roda na própria
+    requisição.
+    """
+
+    def __init__(self):
+        self.method = DEFAULT_HASH_METHOD
+        self.salt_length = DEFAULT_SALT_LENGTH
+        self.workers = DEFAULT_WORKERS
+        self.queue_size = DEFAULT_QUEUE_SIZE
+        self.queue_timeout = DEFAULT_QUEUE_TIMEOUT
+        self._lock = threading.Lock()
+        self._pool = None
+        self._slots = None
+        self._method_prefix = None
+
+    def init_app(self, app):
+        """Lê os parâmetros de hash e do pool da configuração do app"""
+        self.method = app.config.get('PASSWORD_HASH_METHOD', DEFAULT_HASH_METHOD)
+        self.salt_length = app.config.get('PASSWORD_SALT_LENGTH', DEFAULT_SALT_LENGTH)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', DEFAULT_WORKERS)
+        self.queue_size = app.config.get('PASSWORD_HASH_QUEUE', DEFAULT_QUEUE_SIZE)
+        self.queue_timeout = app.config.get('PASSWORD_HASH_TIMEOUT', DEFAULT_QUEUE_TIMEOUT)
+        self._pool = None
+        self._slots = None
+        self._method_prefix = None
+
+    def hash(self, password):
+        """Gera o hash da senha com os parâmetros configurados"""
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, password_hash, password):
+        """Verifica a senha contra o hash armazenado"""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Indica se o hash foi gerado com parâmetros diferentes dos atuais"""
+        if self._method_prefix is None:
+            # O Werkzeug completa parâmetros omitidos (ex.: iterações), então o
+            # prefixo canônico é obtido de um hash real
+            self._method_prefix = generate_password_hash('', self.method, 1).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._method_prefix
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        slots = self._get_slots()
+        if not slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusy()
+        try:
+            pool = self._get_pool()
+            if _gevent_active():
+                return pool.apply(fn, args)
+            return pool.submit(fn, *args).result()
+        finally:
+            slots.release()
+
+    def _get_slots(self):
+        with self._lock:
+            if self._slots is None:
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            return self._slots
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                if _gevent_active():
+                    # Threads reais do sistema, fora do loop do gevent
+                    from gevent.threadpool import ThreadPool
+                    self._pool = ThreadPool(self.workers)
+                else:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+            return self._pool
+
+
+password_hasher = PasswordHasher()
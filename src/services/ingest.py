@@ -0,0 +1,180 @@
+import socket
+from flask import Request, request
+from src.services.blobstore import BlobWriter
+
+# Bytes iniciais usados para identificar o tipo real do arquivo
+SNIFF_SIZE = 8 * 1024
+
+# Assinaturas (magic bytes) aceitas para cada extensão
+ZIP_SIGNATURE = b'PK\x03\x04'
+OLE_SIGNATURE = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+def _is_pdf(header):
+    # A especificação tolera bytes antes do cabeçalho %PDF- (até 1 KB)
+    return b'%PDF-' in header[:1024]
+
+
+def _is_mp4(header):
+    return header[4:8] == b'ftyp'
+
+
+def _is_avi(header):
+    return header[:4] == b'RIFF' and header[8:12] == b'AVI '
+
+
+def _is_text(header):
+    return b'\x00' not in header
+
+
+SIGNATURES = {
+    'pdf': _is_pdf,
+    'mp4': _is_mp4,
+    'avi': _is_avi,
+    'xlsx': lambda header: header.startswith(ZIP_SIGNATURE),
+    'ods': lambda header: header.startswith(ZIP_SIGNATURE),
+    'xls': lambda header: header.startswith(OLE_SIGNATURE),
+    'csv': _is_text,
+}
+
+
+class InvalidContent(Exception):
+    """Conteúdo do arquivo não corresponde à extensão informada
+
+    Não herda de ValueError: o parser de formulários do Werkzeug descarta
+    ValueError silenciosamente e o upload pareceria vazio.
+    """
+
+
+def file_extension(filename):
+    if not filename or '.' not in filename:
+        return None
+    return filename.rsplit('.', 1)[1].lower()
+
+
+def check_signature(extension, header):
+    """Confere os primeiros bytes do arquivo com a assinatura esperada para a extensão"""
+    check = SIGNATURES.get(extension)
+    if check is None:
+        raise InvalidContent('Tipo de arquivo não suportado')
+    if not header or not check(header):
+        raise InvalidContent(f'Conteúdo do arquivo não corresponde à extensão .{extension}')
+
+
+class IngestStream(BlobWriter):
+    """Destino do upload durante o parsing do multipart
+
+    Recebe os blocos direto do corpo da requisição e os grava no temporário do
+    armazenamento por conteúdo, calculando SHA-256 e tamanho. O tipo é
+    conferido assim que os primeiros ``SNIFF_SIZE`` bytes chegam: um arquivo
+    inválido é rejeitado sem ler o resto do corpo.
+    """
+
+    def __init__(self, filename):
+        super().__init__()
+        self.extension = file_extension(filename)
+        self._header = b''
+        self.validated = False
+        self.finished = False
+
+    def write(self, data):
+        if not self.validated:
+            self._header += data[:SNIFF_SIZE - len(self._header)]
+            if len(self._header) >= SNIFF_SIZE:
+                self.validate()
+        return super().write(data)
+
+    def validate(self):
+        """Confere a assinatura com os bytes recebidos; descarta o temporário se inválido"""
+        try:
+            check_signature(self.extension, self._header)
+        except InvalidContent:
+            self.abort()
+            raise
+        self.validated = True
+
+    def finish(self):
+        """Termina a gravação e retorna o SHA-256 (valida arquivos menores que SNIFF_SIZE)"""
+        if not self.validated:
+            self.validate()
+        self.finished = True
+        return self.close()
+
+    def close(self):
+        # Chamado pelo Werkzeug ao fim da requisição: upload não aproveitado pela rota
+        if not self.finished:
+            self.abort()
+        return super().close()
+
+    # Interface de arquivo esperada pelo Werkzeug (FileStorage)
+    def seek(self, offset, whence=0):
+        self.file.flush()
+        return self.file.seek(offset, whence)
+
+    def tell(self):
+        return self.file.tell()
+
+    def read(self, size=-1):
+        return self.file.read(size)
+
+    def readline(self, size=-1):
+        return self.file.readline(size)
+
+
+def ingest_upload(file_storage):
+    """Retorna o IngestStream já gravado e validado de um arquivo enviado
+
+    Uploads recebidos pelo IngestRequest já estão gravados; outros streams são
+    copiados uma vez para o armazenamento.
+    """
+    stream = file_storage.stream
+    if not isinstance(stream, IngestStream):
+        stream = IngestStream(file_storage.filename)
+        try:
+            stream.copy_from(file_storage.stream)
+        except Exception:
+            stream.abort()
+            raise
+    stream.finish()
+    return stream
+
+
+def close_after_rejection(response, status=400):
+    """Encerra a conexão após recusar um corpo de requisição lido só em parte
+
+    Sem isso o servidor leria e descartaria o restante do upload para manter
+    a conexão (keep-alive), e a recusa antecipada não economizaria banda. O
+    cabeçalho Connection: close basta no servidor do Werkzeug e em proxies; o
+    gunicorn ignora esse cabeçalho vindo da aplicação, então o lado de leitura
+    do socket é fechado depois do envio da resposta e a conexão termina em
+    vez de ser drenada.
+    """
+    response.status_code = status
+    response.headers['Connection'] = 'close'
+    sock = request.environ.get('gunicorn.socket')
+    if sock is not None:
+        response.call_on_close(lambda: _shutdown_read(sock))
+    return response
+
+
+def _shutdown_read(sock):
+    try:
+        sock.shutdown(socket.SHUT_RD)
+    except OSError:
+        pass
+
+
+class IngestRequest(Request):
+    """Request que grava os arquivos do upload direto no armazenamento
+
+    Sem isso o Werkzeug gravaria o arquivo em um temporário (spool) que depois
+    seria copiado para o destino final.
+    """
+
+    INGEST_ENDPOINTS = {'files.upload_file'}
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        if self.endpoint in self.INGEST_ENDPOINTS:
+            return IngestStream(filename)
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
@@ -0,0 +1,265 @@
+import json
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime, timedelta
+from src.models.user import db, Job
+from src.services.hashing import _gevent_active
+
+logger = logging.getLogger(__name__)
+
+# Threads que executam tarefas em cada processo (0 desativa; ver comando run-jobs)
+DEFAULT_WORKERS = 2
+
+# Intervalo de verificação de novas tarefas (segundos); tarefas do próprio
+# processo acordam os workers imediatamente
+POLL_INTERVAL = 1.0
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Espera antes de nova tentativa: 5s, 10s, 20s...
+RETRY_BASE_DELAY = 5
+
+# Tarefa "running" há mais tempo que isso é considerada abandonada (processo
+# encerrado no meio da execução) e volta para a fila
+JOB_LEASE = timedelta(minutes=10)
+
+# Tarefas concluídas são removidas após esse período
+JOB_RETENTION = timedelta(days=7)
+
+MAINTENANCE_INTERVAL = 60
+
+# Estados em que uma tarefa com a mesma chave não é enfileirada de novo
+# (tarefas com falha só voltam por POST /api/jobs/<id>/retry)
+DEDUPLICATED_STATUSES = ('pending', 'running', 'failed')
+
+_handlers = {}
+
+# Funções executadas periodicamente pelos workers de tarefas: [função, intervalo, última execução]
+_periodic = []
+
+
+def periodic_task(interval):
+    """Registra uma função de limpeza executada a cada ``interval`` segundos
+
+    Roda em cada processo com workers de tarefas (ou no comando run-jobs),
+    dentro do contexto do app; a função deve tolerar execuções simultâneas em
+    outros processos.
+    """
+    def decorator(fn):
+        _periodic.append([fn, interval, None])
+        return fn
+    return decorator
+
+
+def job_handler(kind):
+    """Registra a função que executa as tarefas do tipo ``kind``"""
+    def decorator(fn):
+        _handlers[kind] = fn
+        return fn
+    return decorator
+
+
+def run_blocking(fn, *args):
+    """Executa I/O de disco ou processamento pesado fora do loop do gevent
+
+    Com gevent, os workers de tarefas são greenlets: o trabalho vai para uma
+    thread do sistema. Sem gevent, eles já são threads e ``fn`` roda direto.
+    """
+    if _gevent_active():
+        import gevent
+        return gevent.get_hub().threadpool.apply(fn, args)
+    return fn(*args)
+
+
+class JobQueue:
+    """Fila de tarefas persistida no banco, executada por threads em cada processo
+
+    As tarefas são gravadas na mesma transação da alteração que as originou
+    e reservadas com um UPDATE condicional, então vários processos (workers
+    do gunicorn ou o comando run-jobs) podem consumir a mesma fila.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.workers = DEFAULT_WORKERS
+        self.poll_interval = POLL_INTERVAL
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._last_maintenance = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = app.config.get('JOB_WORKERS', DEFAULT_WORKERS)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', POLL_INTERVAL)
+        # Os workers começam na primeira requisição do processo (depois do fork)
+        app.before_request(self.start)
+
+    def enqueue(self, kind, payload=None, key=None, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Adiciona uma tarefa à sessão atual; ela é gravada no commit de quem chamou
+
+        Com ``key``, retorna a tarefa existente se já houver uma equivalente
+        pendente, em execução ou com falha.
+        """
+        if key is not None:
+            existing = Job.query.filter(
+                Job.key == key, Job.status.in_(DEDUPLICATED_STATUSES)
+            ).first()
+            if existing is not None:
+                return existing
+
+        job = Job(
+            kind=kind,
+            key=key,
+            payload=json.dumps(payload or {}),
+            max_attempts=max_attempts,
+            run_at=datetime.utcnow() + timedelta(seconds=delay)
+        )
+        db.session.add(job)
+        self._wake.set()
+        return job
+
+    def retry(self, job):
+        """Recoloca uma tarefa com falha na fila"""
+        job.status = 'pending'
+        job.attempts = 0
+        job.run_at = datetime.utcnow()
+        job.finished_at = None
+        self._wake.set()
+
+    def start(self):
+        """Inicia os workers deste processo (uma única vez)"""
+        if self._threads or self.workers <= 0:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._work_loop, name=f'job-worker-{index}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.stop)
+
+    def stop(self, timeout=30):
+        """Encerramento gracioso: espera as tarefas em andamento terminarem"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        self._stopping.set()
+        self._wake.set()
+        for thread in threads:
+            thread.join(timeout)
+
+    def run_forever(self):
+        """Executa tarefas no processo atual até ser interrompido (comando run-jobs)"""
+        self._stopping.clear()
+        try:
+            self._work_loop()
+        except KeyboardInterrupt:
+            self._stopping.set()
+
+    def _work_loop(self):
+        with self.app.app_context():
+            while not self._stopping.is_set():
+                try:
+                    self._maintenance()
+                    self._run_periodic()
+                    job_id = self._claim()
+                    if job_id is not None:
+                        self._execute(job_id)
+                except Exception:
+                    logger.exception('Erro no worker de tarefas')
+                    db.session.rollback()
+                    job_id = None
+                finally:
+                    db.session.remove()
+
+                if job_id is None:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+
+    def _claim(self):
+        """Reserva a próxima tarefa pronta para execução e retorna seu id"""
+        now = datetime.utcnow()
+        candidates = db.session.query(Job.id).filter(
+            Job.status == 'pending', Job.run_at <= now
+        ).order_by(Job.run_at, Job.id).limit(self.workers + 1).all()
+
+        for (job_id,) in candidates:
+            claimed = Job.query.filter(Job.id == job_id, Job.status == 'pending').update(
+                {'status': 'running', 'locked_at': now, 'attempts': Job.attempts + 1},
+                synchronize_session=False
+            )
+            db.session.commit()
+            if claimed:
+                return job_id
+        db.session.rollback()
+        return None
+
+    def _execute(self, job_id):
+        job = db.session.get(Job, job_id)
+        handler = _handlers.get(job.kind)
+        try:
+            if handler is None:
+                raise LookupError(f'Tipo de tarefa desconhecido: {job.kind}')
+            handler(json.loads(job.payload))
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.last_error = f'{type(e).__name__}: {e}'
+            if job.attempts >= job.max_attempts:
+                job.status = 'failed'
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = 'pending'
+                job.run_at = datetime.utcnow() + timedelta(
+                    seconds=RETRY_BASE_DELAY * 2 ** (job.attempts - 1)
+                )
+            db.session.commit()
+            logger.warning('Tarefa %s (%s) falhou: %s', job.id, job.kind, job.last_error)
+            return
+
+        job.status = 'done'
+        job.last_error = None
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+    def _maintenance(self):
+        """Devolve à fila tarefas abandonadas e remove tarefas concluídas antigas"""
+        now = datetime.utcnow()
+        if (now.timestamp() - self._last_maintenance) < MAINTENANCE_INTERVAL:
+            return
+        self._last_maintenance = now.timestamp()
+
+        Job.query.filter(Job.status == 'running', Job.locked_at < now - JOB_LEASE).update(
+            {'status': 'pending', 'run_at': now}, synchronize_session=False
+        )
+        Job.query.filter(Job.status == 'done', Job.finished_at < now - JOB_RETENTION).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+
+    def _run_periodic(self):
+        now = time.monotonic()
+        for task in _periodic:
+            fn, interval, last_run = task
+            if last_run is not None and now - last_run < interval:
+                continue
+            with self._lock:
+                # Outra thread deste processo pode ter executado a tarefa agora
+                if task[2] is not last_run:
+                    continue
+                task[2] = now
+            try:
+                fn()
+            except Exception:
+                logger.exception('Erro na tarefa periódica %s', fn.__name__)
+                db.session.rollback()
+
+
+job_queue = JobQueue()
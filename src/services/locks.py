@@ -0,0 +1,40 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local)
+    fcntl = None
+
+# Intervalo entre tentativas de obter um lock ocupado (segundos)
+LOCK_POLL_INTERVAL = 0.01
+
+_thread_lock = threading.Lock()
+
+
+@contextmanager
+def file_lock(path):
+    """Lock exclusivo entre processos baseado em flock
+
+    A espera é feita com tentativas não bloqueantes e time.sleep, para não
+    travar o loop do gevent enquanto outro worker segura o lock.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as lock_file:
+        if fcntl is None:
+            with _thread_lock:
+                yield
+            return
+
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
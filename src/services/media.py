@@ -0,0 +1,237 @@
+import io
+import os
+import uuid
+import mimetypes
+from datetime import datetime, timezone
+from flask import request, Response
+from werkzeug.http import http_date, is_resource_modified
+from src.services.metrics import metrics
+
+# Tamanho do buffer usado quando não é possível usar sendfile
+MEDIA_CHUNK_SIZE = 256 * 1024
+
+# Limite de faixas por requisição (acima disso o arquivo é enviado inteiro)
+MAX_RANGES = 16
+
+# Tempo de cache dos arquivos de mídia no navegador (segundos)
+MEDIA_CACHE_MAX_AGE = 3600
+
+
+def guess_mimetype(path):
+    """Determina o content-type de um arquivo de mídia"""
+    mimetype, _ = mimetypes.guess_type(path)
+    return mimetype or 'application/octet-stream'
+
+
+def _can_sendfile():
+    """Verifica se o servidor WSGI faz cópia zero (sendfile) com wsgi.file_wrapper"""
+    environ = request.environ
+    return (
+        environ.get('wsgi.file_wrapper') is not None
+        and environ.get('SERVER_SOFTWARE', '').startswith('gunicorn')
+    )
+
+
+class TrackedMediaFile(io.FileIO):
+    """Arquivo de mídia contado como stream ativo até ser fechado
+
+    O fechamento acontece ao fim do envio, tanto pelo sendfile do gunicorn
+    quanto pelo FileRangeIterator.
+    """
+
+    def __init__(self, path):
+        super().__init__(path, 'rb')
+        metrics.stream_opened('media')
+
+    def close(self):
+        if not self.closed:
+            metrics.stream_closed('media')
+        super().close()
+
+
+def _open_media(path):
+    if metrics.enabled:
+        return TrackedMediaFile(path)
+    return open(path, 'rb', buffering=0)
+
+
+def _iter_file_range(f, start, end, chunk_size=MEDIA_CHUNK_SIZE):
+    """Lê o intervalo [start, end) do arquivo em blocos de tamanho limitado"""
+    f.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        data = f.read(min(chunk_size, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+        yield data
+
+
+class FileRangeIterator:
+    """Iterável WSGI que envia partes de um arquivo e sempre o fecha ao final
+
+    Cada parte é uma tupla (cabeçalho, início, fim); o cabeçalho pode ser vazio.
+    """
+
+    def __init__(self, f, parts, closing=b''):
+        self.f = f
+        self.parts = parts
+        self.closing = closing
+
+    def __iter__(self):
+        for header, start, end in self.parts:
+            if header:
+                yield header
+            yield from _iter_file_range(self.f, start, end)
+            if header:
+                yield b'\r\n'
+        if self.closing:
+            yield self.closing
+
+    def close(self):
+        self.f.close()
+
+
+def parse_byte_ranges(range_header, size):
+    """Converte o cabeçalho Range em intervalos [start, end) satisfatíveis e mesclados
+
+    Retorna None quando o cabeçalho deve ser ignorado e uma lista vazia quando
+    nenhuma faixa pode ser atendida (416).
+    """
+    if range_header is None or range_header.units != 'bytes':
+        return None
+
+    ranges = []
+    for begin, end in range_header.ranges:
+        if begin < 0:
+            start = max(size + begin, 0)
+            stop = size
+        else:
+            start = begin
+            stop = size if end is None else min(end, size)
+        if start < stop:
+            ranges.append((start, stop))
+
+    # Mesclar faixas sobrepostas ou adjacentes
+    ranges.sort()
+    merged = []
+    for start, stop in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], stop))
+        else:
+            merged.append((start, stop))
+
+    if len(merged) > MAX_RANGES:
+        return None
+
+    return merged
+
+
+def send_media(path, max_age=MEDIA_CACHE_MAX_AGE, immutable=False):
+    """Envia um arquivo de mídia com suporte a Range/206, multi-range e sendfile
+
+    Levanta FileNotFoundError se o arquivo não existir em disco. ``immutable``
+    indica conteúdo que nunca muda na mesma URL (nomes derivados do conteúdo).
+    """
+    f = _open_media(path)
+
+    try:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        mimetype = guess_mimetype(path)
+        etag = f'{stat.st_size:x}-{stat.st_mtime_ns:x}'
+        modified_at = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+        last_modified = http_date(modified_at)
+
+        if not is_resource_modified(request.environ, etag=etag, last_modified=modified_at):
+            f.close()
+            response = Response(status=304)
+            _set_cache_headers(response, etag, last_modified, max_age, immutable)
+            return response
+
+        ranges = None
+        if request.range is not None and _if_range_matches(etag, stat.st_mtime):
+            ranges = parse_byte_ranges(request.range, size)
+
+        if ranges == []:
+            f.close()
+            response = Response(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            _set_cache_headers(response, etag, last_modified, max_age, immutable)
+            return response
+
+        if ranges is None:
+            response = _single_range_response(f, 0, size, size, mimetype, status=200)
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            response = _single_range_response(f, start, end, size, mimetype, status=206)
+            response.headers['Content-Range'] = f'bytes {start}-{end - 1}/{size}'
+        else:
+            response = _multipart_response(f, ranges, size, mimetype)
+
+        _set_cache_headers(response, etag, last_modified, max_age, immutable)
+        return response
+    except Exception:
+        f.close()
+        raise
+
+
+def _if_range_matches(etag, mtime):
+    """Avalia o cabeçalho If-Range (faixas só valem para a mesma versão do arquivo)"""
+    if_range = request.if_range
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return int(mtime) <= if_range.date.timestamp()
+    return True
+
+
+def _single_range_response(f, start, end, size, mimetype, status):
+    """Monta a resposta de um único intervalo, usando sendfile quando disponível"""
+    if _can_sendfile():
+        # O gunicorn envia via os.sendfile a partir da posição atual do arquivo,
+        # limitado pelo Content-Length
+        f.seek(start)
+        body = request.environ['wsgi.file_wrapper'](f, MEDIA_CHUNK_SIZE)
+    else:
+        body = FileRangeIterator(f, [(b'', start, end)])
+
+    response = Response(body, status=status, mimetype=mimetype, direct_passthrough=True)
+    response.content_length = end - start
+    return response
+
+
+def _multipart_response(f, ranges, size, mimetype):
+    """Monta a resposta multipart/byteranges para múltiplos intervalos"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    content_length = 0
+    for start, end in ranges:
+        header = (
+            f'--{boundary}\r\n'
+            f'Content-Type: {mimetype}\r\n'
+            f'Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n'
+        ).encode('latin-1')
+        parts.append((header, start, end))
+        content_length += len(header) + (end - start) + 2
+    closing = f'--{boundary}--\r\n'.encode('latin-1')
+    content_length += len(closing)
+
+    response = Response(
+        FileRangeIterator(f, parts, closing),
+        status=206,
+        content_type=f'multipart/byteranges; boundary={boundary}',
+        direct_passthrough=True
+    )
+    response.content_length = content_length
+    return response
+
+
+def _set_cache_headers(response, etag, last_modified, max_age=MEDIA_CACHE_MAX_AGE, immutable=False):
+    """Define cabeçalhos de cache e de suporte a faixas"""
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['ETag'] = f'"{etag}"'
+    response.headers['Last-Modified'] = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = immutable
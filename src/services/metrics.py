@@ -0,0 +1,277 @@
+import os
+import json
+import time
+import threading
+from flask import g, request, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.models.user import db
+from src.services.database import pool_stats
+
+# Limites dos histogramas (segundos e consultas por requisição)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+HISTOGRAM_BUCKETS = {
+    'http_request_duration_seconds': LATENCY_BUCKETS,
+    'http_request_db_queries': QUERY_COUNT_BUCKETS,
+}
+
+# Rotas que recebem o conteúdo de arquivos (vazão de upload)
+UPLOAD_ENDPOINTS = {'files.upload_file', 'uploads.append_chunk'}
+
+# Intervalo mínimo entre gravações do resumo do worker em STATE_FOLDER (segundos)
+FLUSH_INTERVAL = 5
+
+DESCRIPTIONS = {
+    'http_requests_total': ('counter', 'Requisições atendidas'),
+    'http_request_duration_seconds': ('histogram', 'Tempo até o início da resposta'),
+    'http_response_bytes_total': ('counter', 'Bytes enviados (Content-Length das respostas)'),
+    'http_request_db_queries': ('histogram', 'Consultas ao banco por requisição'),
+    'db_queries_total': ('counter', 'Consultas ao banco feitas por requisições'),
+    'db_query_duration_seconds_total': ('counter', 'Tempo gasto em consultas ao banco por requisições'),
+    'upload_bytes_total': ('counter', 'Bytes recebidos em uploads'),
+    'upload_duration_seconds_total': ('counter', 'Tempo das requisições de upload'),
+    'active_streams': ('gauge', 'Conexões de streaming abertas (SSE e mídia)'),
+    'db_pool_checkouts_total': ('counter', 'Conexões obtidas do pool'),
+    'db_pool_checkout_waits_total': ('counter', 'Obtenções de conexão que precisaram esperar'),
+    'db_pool_checkout_timeouts_total': ('counter', 'Esperas por conexão que excederam o timeout'),
+    'db_pool_checkout_wait_seconds_total': ('counter', 'Tempo total de espera por conexões'),
+    'db_pool_connects_total': ('counter', 'Conexões abertas com o banco'),
+    'db_pool_closes_total': ('counter', 'Conexões fechadas'),
+    'db_pool_checked_out': ('gauge', 'Conexões em uso'),
+    'db_pool_size': ('gauge', 'Tamanho configurado do pool'),
+}
+
+POOL_METRICS = {
+    'checkouts': 'db_pool_checkouts_total',
+    'waits': 'db_pool_checkout_waits_total',
+    'timeouts': 'db_pool_checkout_timeouts_total',
+    'wait_seconds_total': 'db_pool_checkout_wait_seconds_total',
+    'connects': 'db_pool_connects_total',
+    'closes': 'db_pool_closes_total',
+    'checked_out': 'db_pool_checked_out',
+    'size': 'db_pool_size',
+}
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Metrics:
+    """Métricas de desempenho do processo, no formato de texto do Prometheus
+
+    Desativadas por padrão (METRICS_ENABLED): sem os hooks de requisição e os
+    eventos do SQLAlchemy, o custo é uma verificação de atributo nos pontos de
+    streaming. Cada worker grava periodicamente um resumo em
+    STATE_FOLDER/metrics, e o endpoint soma os resumos dos workers vivos.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.folder = None
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._last_flush = 0
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', False)
+        if not self.enabled:
+            return
+        self.folder = os.path.join(app.config['STATE_FOLDER'], 'metrics')
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def add_gauge(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = HISTOGRAM_BUCKETS[name]
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * (len(buckets) + 1), 0, 0]
+            index = next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def stream_opened(self, kind):
+        if self.enabled:
+            self.add_gauge('active_streams', 1, kind=kind)
+
+    def stream_closed(self, kind):
+        if self.enabled:
+            self.add_gauge('active_streams', -1, kind=kind)
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = [0, 0.0]
+
+    def _after_request(self, response):
+        started = g.get('metrics_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'none'
+        queries, query_time = g.metrics_queries
+
+        self.inc('http_requests_total', endpoint=endpoint, method=request.method,
+                 status=str(response.status_code))
+        self.observe('http_request_duration_seconds', elapsed, endpoint=endpoint, method=request.method)
+        self.observe('http_request_db_queries', queries, endpoint=endpoint)
+        if queries:
+            self.inc('db_queries_total', queries, endpoint=endpoint)
+            self.inc('db_query_duration_seconds_total', query_time, endpoint=endpoint)
+        if response.content_length:
+            self.inc('http_response_bytes_total', response.content_length, endpoint=endpoint)
+        if endpoint in UPLOAD_ENDPOINTS and request.content_length:
+            self.inc('upload_bytes_total', request.content_length, endpoint=endpoint)
+            self.inc('upload_duration_seconds_total', elapsed, endpoint=endpoint)
+
+        if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self._flush()
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('metrics_query_started')
+        if not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        if has_request_context() and 'metrics_queries' in g:
+            g.metrics_queries[0] += 1
+            g.metrics_queries[1] += elapsed
+
+    def snapshot(self):
+        """Valores deste processo, incluindo os contadores do pool de conexões"""
+        with self._lock:
+            data = {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, list(labels), value] for (name, labels), value in self._gauges.items()],
+                'histograms': [
+                    [name, list(labels), [list(buckets), total, count]]
+                    for (name, labels), (buckets, total, count) in self._histograms.items()
+                ],
+            }
+        for field, value in pool_stats.snapshot(db.engine).items():
+            name = POOL_METRICS.get(field)
+            if name is not None:
+                kind = 'counters' if DESCRIPTIONS[name][0] == 'counter' else 'gauges'
+                data[kind].append([name, [], value])
+        return data
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+    def _worker_snapshots(self):
+        """Resumos gravados pelos demais workers ainda em execução"""
+        snapshots = []
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return snapshots
+        for name in names:
+            pid, _, ext = name.partition('.')
+            if ext != 'json' or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                # Worker encerrado: seus valores saem da soma (reinício dos contadores)
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            except PermissionError:
+                pass
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (FileNotFoundError, ValueError):
+                continue
+        return snapshots
+
+    def collect(self):
+        """Soma os valores de todos os workers: {(nome, labels): valor}"""
+        scalars, histograms = {}, {}
+        for snapshot in [self.snapshot()] + self._worker_snapshots():
+            for kind in ('counters', 'gauges'):
+                for name, labels, value in snapshot[kind]:
+                    key = (name, tuple(tuple(label) for label in labels))
+                    scalars[key] = scalars.get(key, 0) + value
+            for name, labels, (buckets, total, count) in snapshot['histograms']:
+                key = (name, tuple(tuple(label) for label in labels))
+                merged = histograms.setdefault(key, [[0] * len(buckets), 0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return scalars, histograms
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+        scalars, histograms = self.collect()
+        lines = []
+        for name, (kind, description) in DESCRIPTIONS.items():
+            if kind == 'histogram':
+                samples = sorted((item for item in histograms.items() if item[0][0] == name), key=lambda item: item[0])
+            else:
+                samples = sorted((item for item in scalars.items() if item[0][0] == name), key=lambda item: item[0])
+            if not samples:
+                continue
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (_, labels), value in samples:
+                if kind != 'histogram':
+                    lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                buckets, total, count = value
+                cumulative = 0
+                bounds = [str(bound) for bound in HISTOGRAM_BUCKETS[name]] + ['+Inf']
+                for bound, bucket in zip(bounds, buckets):
+                    cumulative += bucket
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+metrics = Metrics()
@@ -0,0 +1,110 @@
+from sqlalchemy import case, func, select, update
+from src.models.user import db, File
+
+# Intervalo entre posições consecutivas: mover um arquivo usa o ponto médio
+# entre os vizinhos, sem reescrever as demais linhas
+ORDER_STEP = 1024
+
+# Linhas por UPDATE ... CASE (limite de parâmetros do SQLite)
+BULK_UPDATE_BATCH = 400
+
+
+def next_order_expression():
+    """Próxima posição no fim da playlist, calculada pelo banco no próprio INSERT
+
+    Evita o intervalo entre ler max(upload_order) e inserir; empates entre
+    uploads simultâneos são desfeitos pelo id na ordenação (upload_order, id).
+    """
+    return select(func.coalesce(func.max(File.upload_order), 0) + ORDER_STEP).scalar_subquery()
+
+
+def bulk_set_order(orders):
+    """Aplica {file_id: upload_order} com um UPDATE ... CASE por lote
+
+    Retorna a quantidade de linhas atualizadas. Deve ser chamada dentro da
+    transação de quem chamou (o commit fica com a rota).
+    """
+    items = list(orders.items())
+    updated = 0
+    for start in range(0, len(items), BULK_UPDATE_BATCH):
+        batch = dict(items[start:start + BULK_UPDATE_BATCH])
+        result = db.session.execute(
+            update(File)
+            .where(File.id.in_(batch.keys()))
+            .values(upload_order=case(batch, value=File.id))
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+    return updated
+
+
+def spaced_orders(file_ids):
+    """Posições espaçadas por ORDER_STEP para uma sequência completa de arquivos"""
+    return {file_id: (index + 1) * ORDER_STEP for index, file_id in enumerate(file_ids)}
+
+
+def rebalance():
+    """Renumera toda a playlist com ORDER_STEP entre posições, em um único UPDATE"""
+    ranked = select(
+        File.id.label('id'),
+        (func.row_number().over(order_by=(File.upload_order, File.id)) * ORDER_STEP).label('position')
+    ).subquery()
+    db.session.execute(
+        update(File)
+        .where(File.id == ranked.c.id)
+        .values(upload_order=ranked.c.position)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _neighbors(file_id, after_id=None, before_id=None):
+    """Chaves (upload_order, id) dos vizinhos entre os quais o arquivo será colocado"""
+    key = db.tuple_(File.upload_order, File.id)
+    others = db.session.query(File.upload_order, File.id).filter(File.id != file_id)
+
+    if after_id is not None:
+        previous = db.session.query(File.upload_order, File.id).filter(File.id == after_id).first()
+        if previous is None:
+            raise LookupError(after_id)
+        following = others.filter(key > db.tuple_(*previous)).order_by(File.upload_order, File.id).first()
+    elif before_id is not None:
+        following = db.session.query(File.upload_order, File.id).filter(File.id == before_id).first()
+        if following is None:
+            raise LookupError(before_id)
+        previous = others.filter(key < db.tuple_(*following)).order_by(
+            File.upload_order.desc(), File.id.desc()
+        ).first()
+    else:
+        # Sem referência: início da playlist
+        previous = None
+        following = others.order_by(File.upload_order, File.id).first()
+    return previous, following
+
+
+def move_file(file, after_id=None, before_id=None):
+    """Move um arquivo para depois de ``after_id`` ou antes de ``before_id``
+
+    Só a linha movida é atualizada; quando não há espaço entre os vizinhos a
+    playlist é renumerada uma vez (um UPDATE) e o cálculo é refeito.
+    """
+    for attempt in range(2):
+        previous, following = _neighbors(file.id, after_id, before_id)
+        if previous is None and following is None:
+            return file.upload_order
+        if following is None:
+            new_order = previous.upload_order + ORDER_STEP
+        elif previous is None:
+            new_order = following.upload_order - ORDER_STEP
+        elif following.upload_order - previous.upload_order >= 2:
+            new_order = (previous.upload_order + following.upload_order) // 2
+        elif attempt == 0:
+            rebalance()
+            continue
+        else:
+            raise RuntimeError('Não foi possível calcular a nova posição')
+
+        db.session.execute(
+            update(File).where(File.id == file.id).values(upload_order=new_order)
+            .execution_options(synchronize_session=False)
+        )
+        return new_order
@@ -0,0 +1,58 @@
+import json
+import base64
+
+# Tamanho de página padrão e máximo das listagens paginadas
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado"""
+
+
+def encode_cursor(*values):
+    """Codifica a chave da última linha retornada em um cursor opaco"""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Decodifica um cursor gerado por encode_cursor com ``size`` valores inteiros"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, int) for v in values):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def parse_page_size(value):
+    """Valida o parâmetro limit, aplicando o padrão e o máximo"""
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    limit = int(value)
+    if limit < 1:
+        raise ValueError(value)
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def parse_int(value):
+    """Converte um parâmetro inteiro de query string (ValueError se inválido)"""
+    if value is None:
+        return None
+    return int(value)
+
+
+def parse_bool(value):
+    """Converte parâmetros de query string como true/false, 1/0"""
+    if value is None:
+        return None
+    lowered = value.lower()
+    if lowered in ('1', 'true', 'yes', 'sim'):
+        return True
+    if lowered in ('0', 'false', 'no', 'nao', 'não'):
+        return False
+    raise ValueError(value)
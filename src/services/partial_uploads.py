@@ -0,0 +1,247 @@
+import os
+import re
+import json
+import time
+import uuid
+import base64
+import hashlib
+from flask import current_app
+from src.services.ingest import SNIFF_SIZE, check_signature, file_extension
+from src.services.jobs import periodic_task, run_blocking
+
+try:
+    import fcntl
+except ImportError:  # Windows (desenvolvimento local)
+    fcntl = None
+
+# Buffer de cópia do corpo da requisição para o arquivo parcial
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Tamanho de bloco sugerido aos clientes
+RECOMMENDED_CHUNK_SIZE = 8 * 1024 * 1024
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# Uploads sem atividade por mais que isso são removidos (segundos; PARTIAL_UPLOAD_TTL)
+DEFAULT_UPLOAD_TTL = 24 * 3600
+
+# Intervalo entre varreduras de uploads abandonados (segundos)
+SWEEP_INTERVAL = 600
+
+
+class UploadConflict(Exception):
+    """Bloco enviado fora de ordem ou upload sendo gravado por outra requisição"""
+
+
+class ChecksumMismatch(Exception):
+    """Checksum informado pelo cliente não confere com os dados recebidos"""
+
+
+class UploadTooLarge(Exception):
+    """Dados recebidos excedem o tamanho declarado no início do upload"""
+
+
+def partial_folder():
+    """Pasta dos uploads em andamento (mesmo sistema de arquivos dos definitivos)"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], '.partial')
+
+
+def parse_checksum_header(value):
+    """Interpreta o cabeçalho ``Upload-Checksum: sha256 <base64>``"""
+    if not value:
+        return None
+    try:
+        algorithm, digest = value.split(' ', 1)
+        if algorithm.lower() != 'sha256':
+            raise ValueError(value)
+        return base64.b64decode(digest.strip(), validate=True)
+    except ValueError:
+        raise ChecksumMismatch('Cabeçalho Upload-Checksum inválido')
+
+
+class PartialUpload:
+    """Upload em blocos, retomável a partir do último offset gravado
+
+    Os dados ficam em ``.partial/<id>.part`` e os metadados em
+    ``.partial/<id>.json``. O offset confirmado é o próprio tamanho do arquivo
+    parcial, então qualquer worker pode continuar o upload.
+    """
+
+    def __init__(self, upload_id, meta):
+        self.upload_id = upload_id
+        self.meta = meta
+
+    @property
+    def part_path(self):
+        return os.path.join(partial_folder(), f'{self.upload_id}.part')
+
+    @property
+    def meta_path(self):
+        return os.path.join(partial_folder(), f'{self.upload_id}.json')
+
+    @classmethod
+    def create(cls, **meta):
+        """Inicia um novo upload"""
+        os.makedirs(partial_folder(), exist_ok=True)
+        upload = cls(uuid.uuid4().hex, dict(meta, created_at=time.time()))
+        open(upload.part_path, 'wb').close()
+        with open(upload.meta_path, 'w') as f:
+            json.dump(upload.meta, f)
+        return upload
+
+    @classmethod
+    def load(cls, upload_id):
+        """Carrega um upload em andamento ou retorna None"""
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            return None
+        upload = cls(upload_id, None)
+        try:
+            with open(upload.meta_path) as f:
+                upload.meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if not os.path.exists(upload.part_path):
+            return None
+        return upload
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.part_path)
+
+    @property
+    def size(self):
+        return self.meta['size']
+
+    def append(self, stream, offset, checksum=None):
+        """Grava um bloco a partir de ``offset`` e retorna o novo offset
+
+        O bloco é lido do stream em pedaços de tamanho limitado. Se um checksum
+        for informado e não conferir (ou a conexão cair no meio do bloco), o
+        arquivo volta ao offset anterior. O primeiro bloco tem o tipo conferido
+        pelos magic bytes antes de ser gravado.
+        """
+        with open(self.part_path, 'r+b') as f:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    raise UploadConflict('Upload em andamento em outra requisição')
+
+            current = os.fstat(f.fileno()).st_size
+            if offset != current:
+                raise UploadConflict(f'Offset esperado: {current}')
+
+            digest = hashlib.sha256()
+            written = offset
+            f.seek(offset)
+            try:
+                while True:
+                    data = stream.read(COPY_BUFFER_SIZE)
+                    if not data:
+                        break
+                    if written == 0:
+                        check_signature(file_extension(self.meta['original_name']), data[:SNIFF_SIZE])
+                    written += len(data)
+                    if written > self.size:
+                        raise UploadTooLarge('Dados excedem o tamanho declarado')
+                    digest.update(data)
+                    f.write(data)
+
+                if checksum is not None and digest.digest() != checksum:
+                    raise ChecksumMismatch('Checksum do bloco não confere')
+            except Exception:
+                if checksum is not None or written > self.size:
+                    f.truncate(offset)
+                raise
+            return written
+
+    def sha256(self):
+        """Calcula o SHA-256 dos dados recebidos"""
+        digest = hashlib.sha256()
+        with open(self.part_path, 'rb') as f:
+            for data in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+                digest.update(data)
+        return digest.hexdigest()
+
+    def discard(self):
+        """Remove arquivos do upload"""
+        for path in (self.part_path, self.meta_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def to_dict(self):
+        return {
+            'upload_id': self.upload_id,
+            'filename': self.meta['original_name'],
+            'size': self.size,
+            'offset': self.offset,
+            'chunk_size': RECOMMENDED_CHUNK_SIZE
+        }
+
+
+def _last_activity(folder, upload_id):
+    """Momento da última gravação de um upload: criação ou último bloco recebido"""
+    times = []
+    meta_path = os.path.join(folder, f'{upload_id}.json')
+    try:
+        with open(meta_path) as f:
+            times.append(json.load(f).get('created_at') or 0)
+    except (FileNotFoundError, ValueError):
+        pass
+    for path in (meta_path, os.path.join(folder, f'{upload_id}.part')):
+        try:
+            times.append(os.path.getmtime(path))
+        except FileNotFoundError:
+            pass
+    return max(times) if times else None
+
+
+def remove_expired_uploads(folder, limit):
+    """Remove os uploads de ``folder`` sem atividade desde ``limit`` (timestamp)
+
+    Um upload recebendo um bloco neste momento (lock do arquivo parcial) é
+    mantido. Retorna a quantidade de uploads removidos.
+    """
+    try:
+        names = os.listdir(folder)
+    except FileNotFoundError:
+        return 0
+    upload_ids = {name.split('.', 1)[0] for name in names if UPLOAD_ID_PATTERN.match(name.split('.', 1)[0])}
+
+    removed = 0
+    for upload_id in upload_ids:
+        last_activity = _last_activity(folder, upload_id)
+        if last_activity is None or last_activity >= limit:
+            continue
+        part_path = os.path.join(folder, f'{upload_id}.part')
+        try:
+            part = open(part_path, 'r+b')
+        except FileNotFoundError:
+            part = None
+        try:
+            if part is not None and fcntl is not None:
+                try:
+                    fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+            for path in (part_path, os.path.join(folder, f'{upload_id}.json')):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            removed += 1
+        finally:
+            if part is not None:
+                part.close()
+    return removed
+
+
+@periodic_task(SWEEP_INTERVAL)
+def sweep_expired_uploads():
+    """Remove uploads em blocos abandonados (sem atividade por PARTIAL_UPLOAD_TTL segundos)"""
+    ttl = current_app.config.get('PARTIAL_UPLOAD_TTL', DEFAULT_UPLOAD_TTL)
+    if ttl <= 0:
+        return 0
+    return run_blocking(remove_expired_uploads, partial_folder(), time.time() - ttl)
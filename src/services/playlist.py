@@ -0,0 +1,103 @@
+import os
+import json
+import hashlib
+import threading
+from collections import namedtuple
+from src.models.user import File
+from src.services.events import PlaylistEventHub
+from src.services.media import guess_mimetype
+from src.services.settings import settings_version
+from src.services.versioning import SharedCounter
+
+# Versão da playlist, incrementada a cada alteração nos arquivos
+playlist_version = SharedCounter('playlist')
+
+# Conexões SSE que recebem as alterações da playlist e das configurações
+playlist_events = PlaylistEventHub({'playlist': playlist_version, 'settings': settings_version})
+
+# Itens anunciados em cabeçalhos Link: rel=preload (o primeiro em exibição e o seguinte)
+PRELOAD_ITEMS = 2
+
+# PDFs até esse tamanho são baixados por inteiro durante o item anterior;
+# vídeos são aquecidos por um elemento <video preload="auto"> oculto
+PREFETCH_MAX_BYTES = 32 * 1024 * 1024
+
+Manifest = namedtuple('Manifest', ['version', 'body', 'etag', 'items'])
+
+
+def prefetch_plan(item):
+    """Como o dashboard deve aquecer o item antes de exibi-lo
+
+    ``as`` segue os destinos de preload do navegador: ``video`` (elemento
+    oculto), ``fetch`` (download completo para o cache HTTP) ou None.
+    """
+    if item['file_type'] == 'video' and item['size']:
+        return {'as': 'video', 'url': item['url']}
+    if item['file_type'] == 'pdf' and item['size'] and item['size'] <= PREFETCH_MAX_BYTES:
+        return {'as': 'fetch', 'url': item['url']}
+    if item['file_type'] == 'document':
+        return {'as': 'fetch', 'url': f"/api/files/{item['id']}/preview"}
+    return {'as': None, 'url': None}
+
+
+def manifest_item(row):
+    """Item da playlist com URL, tamanho, content-type e plano de pré-carregamento"""
+    item = File.row_to_dict(row)
+    item['url'] = f"/api/serve/{row.filename}"
+    try:
+        item['size'] = os.path.getsize(row.file_path)
+    except OSError:
+        item['size'] = None
+    item['content_type'] = guess_mimetype(row.filename)
+    item['prefetch'] = prefetch_plan(item)
+    return item
+
+
+def preload_links(manifest):
+    """Valores do cabeçalho Link (rel=preload) para o início da playlist"""
+    links = []
+    for item in manifest.items[:PRELOAD_ITEMS]:
+        plan = item['prefetch']
+        if plan['as'] == 'video':
+            links.append(f"<{plan['url']}>; rel=preload; as=video; type=\"{item['content_type']}\"")
+        elif plan['as'] == 'fetch':
+            # crossorigin: o pré-carregamento só é reaproveitado por fetch() com o mesmo modo
+            links.append(f"<{plan['url']}>; rel=preload; as=fetch; crossorigin")
+    return links
+
+
+class PlaylistManifest:
+    """Playlist de arquivos ativos já serializada, reaproveitada enquanto a versão não muda"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cached = None
+
+    def get(self):
+        """Retorna o manifesto da versão atual, gerando-o se necessário"""
+        version = playlist_version.value()
+        cached = self._cached
+        if cached is not None and cached.version == version:
+            return cached
+
+        with self._lock:
+            cached = self._cached
+            if cached is not None and cached.version == version:
+                return cached
+
+            rows = File.query_with_uploader().filter(File.is_active.is_(True)).order_by(File.upload_order.asc(), File.id.asc()).all()
+            items = [manifest_item(row) for row in rows]
+            body = json.dumps(items, separators=(',', ':')).encode('utf-8')
+            etag = f'{version}-{hashlib.sha1(body).hexdigest()[:16]}'
+            self._cached = Manifest(version, body, etag, items)
+            return self._cached
+
+
+playlist_manifest = PlaylistManifest()
+
+
+def invalidate_playlist():
+    """Marca a playlist como alterada e notifica as conexões SSE (chamar após o commit)"""
+    version = playlist_version.bump()
+    playlist_events.publish('playlist', version)
+    return version
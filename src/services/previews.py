@@ -0,0 +1,259 @@
+import os
+import csv
+import json
+import uuid
+import codecs
+import shutil
+import zipfile
+from xml.etree.ElementTree import iterparse
+from flask import current_app
+
+PREVIEWS_SUBFOLDER = 'previews'
+
+# Linhas por página da pré-visualização
+PREVIEW_PAGE_ROWS = 100
+
+# Limites da pré-visualização (o arquivo original continua disponível para download)
+PREVIEW_MAX_ROWS = 10000
+PREVIEW_MAX_COLUMNS = 50
+PREVIEW_MAX_CELL_CHARS = 200
+
+# Amostra usada para detectar codificação e separador de CSVs
+CSV_SAMPLE_SIZE = 64 * 1024
+
+XLSX_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+ODS_TABLE_NS = '{urn:oasis:names:tc:opendocument:xmlns:table:1.0}'
+
+
+def previews_folder():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], PREVIEWS_SUBFOLDER)
+
+
+def preview_folder(filename):
+    """Pasta da pré-visualização de um arquivo armazenado
+
+    Indexada pelo nome em disco (SHA-256 do conteúdo), não pelo id do
+    registro: o SQLite reutiliza ids de linhas excluídas, e um id reciclado
+    serviria a pré-visualização do arquivo anterior.
+    """
+    return os.path.join(previews_folder(), filename)
+
+
+def preview_page_path(filename, page):
+    return os.path.join(preview_folder(filename), f'page-{page:04d}.json')
+
+
+def read_preview_meta(filename):
+    """Metadados da pré-visualização já gerada, ou None se ainda não existir"""
+    try:
+        with open(os.path.join(preview_folder(filename), 'meta.json')) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def discard_preview(filename):
+    """Remove a pré-visualização de um arquivo que deixou de ser referenciado"""
+    shutil.rmtree(preview_folder(filename), ignore_errors=True)
+
+
+def _cell(value):
+    if value is None:
+        return ''
+    value = str(value)
+    if len(value) > PREVIEW_MAX_CELL_CHARS:
+        return value[:PREVIEW_MAX_CELL_CHARS - 1] + '…'
+    return value
+
+
+def _trim(row):
+    row = [_cell(value) for value in row[:PREVIEW_MAX_COLUMNS]]
+    while row and row[-1] == '':
+        row.pop()
+    return row
+
+
+def _column_index(ref):
+    """Converte a referência de célula (ex.: ``AB12``) no índice da coluna"""
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - 64
+    return index - 1
+
+
+def iter_csv_rows(path):
+    """Lê um CSV linha a linha, detectando codificação e separador pela amostra inicial"""
+    with open(path, 'rb') as f:
+        sample = f.read(CSV_SAMPLE_SIZE)
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample)
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        encoding = 'latin-1'
+
+    text = sample.decode(encoding, errors='ignore')
+    try:
+        dialect = csv.Sniffer().sniff(text, delimiters=',;\t|')
+    except csv.Error:
+        dialect = csv.excel
+
+    with open(path, newline='', encoding=encoding, errors='replace') as f:
+        yield from csv.reader(f, dialect)
+
+
+def _xlsx_shared_strings(archive):
+    strings = []
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return strings
+    with archive.open('xl/sharedStrings.xml') as f:
+        for _, elem in iterparse(f):
+            if elem.tag == f'{XLSX_NS}si':
+                strings.append(''.join(t.text or '' for t in elem.iter(f'{XLSX_NS}t')))
+                elem.clear()
+    return strings
+
+
+def _xlsx_first_sheet(archive):
+    sheets = sorted(
+        name for name in archive.namelist()
+        if name.startswith('xl/worksheets/') and name.endswith('.xml')
+    )
+    if 'xl/worksheets/sheet1.xml' in sheets:
+        return 'xl/worksheets/sheet1.xml'
+    return sheets[0] if sheets else None
+
+
+def iter_xlsx_rows(path):
+    """Lê a primeira planilha de um XLSX em streaming (iterparse), sem carregar o XML inteiro"""
+    with zipfile.ZipFile(path) as archive:
+        sheet = _xlsx_first_sheet(archive)
+        if sheet is None:
+            return
+        strings = _xlsx_shared_strings(archive)
+
+        with archive.open(sheet) as f:
+            for _, elem in iterparse(f):
+                if elem.tag != f'{XLSX_NS}row':
+                    continue
+                row = []
+                for cell in elem.iter(f'{XLSX_NS}c'):
+                    ref = cell.get('r')
+                    if ref:
+                        index = _column_index(ref)
+                        if index >= PREVIEW_MAX_COLUMNS:
+                            continue
+                        row.extend([''] * (index - len(row)))
+
+                    cell_type = cell.get('t')
+                    value = cell.findtext(f'{XLSX_NS}v')
+                    if cell_type == 's' and value is not None:
+                        value = strings[int(value)] if int(value) < len(strings) else ''
+                    elif cell_type == 'inlineStr':
+                        value = ''.join(t.text or '' for t in cell.iter(f'{XLSX_NS}t'))
+                    elif cell_type == 'b':
+                        value = 'VERDADEIRO' if value == '1' else 'FALSO'
+                    row.append(value)
+                elem.clear()
+                yield row
+
+
+def iter_ods_rows(path):
+    """Lê a primeira tabela de uma planilha ODS em streaming"""
+    row_tag = f'{ODS_TABLE_NS}table-row'
+    cell_tags = {f'{ODS_TABLE_NS}table-cell', f'{ODS_TABLE_NS}covered-table-cell'}
+    columns_repeated = f'{ODS_TABLE_NS}number-columns-repeated'
+    rows_repeated = f'{ODS_TABLE_NS}number-rows-repeated'
+
+    with zipfile.ZipFile(path) as archive, archive.open('content.xml') as f:
+        # Linhas vazias só são emitidas se houver conteúdo depois delas
+        # (o ODS costuma terminar com milhares de linhas vazias repetidas)
+        pending_empty = 0
+        for _, elem in iterparse(f):
+            if elem.tag == f'{ODS_TABLE_NS}table':
+                return
+            if elem.tag != row_tag:
+                continue
+
+            row = []
+            for cell in elem:
+                if cell.tag not in cell_tags:
+                    continue
+                value = '\n'.join(''.join(p.itertext()) for p in cell)
+                repeat = int(cell.get(columns_repeated, 1))
+                row.extend([value] * min(repeat, PREVIEW_MAX_COLUMNS - len(row)))
+                if len(row) >= PREVIEW_MAX_COLUMNS:
+                    break
+            repeat = int(elem.get(rows_repeated, 1))
+            elem.clear()
+
+            if not any(row):
+                pending_empty += repeat
+                continue
+            for _ in range(min(pending_empty, PREVIEW_MAX_ROWS)):
+                yield []
+            pending_empty = 0
+            for _ in range(min(repeat, PREVIEW_MAX_ROWS)):
+                yield row
+
+
+ROW_READERS = {
+    'csv': iter_csv_rows,
+    'xlsx': iter_xlsx_rows,
+    'ods': iter_ods_rows,
+}
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+
+def render_preview(folder, path, extension, source):
+    """Gera as páginas da pré-visualização de uma planilha em ``folder``
+
+    As linhas são lidas e gravadas página a página, então o uso de memória não
+    depende do tamanho do arquivo. As páginas são geradas em uma pasta
+    temporária e publicadas com um rename.
+    """
+    if os.path.exists(folder):
+        return
+
+    os.makedirs(os.path.dirname(folder), exist_ok=True)
+    tmp_folder = f'{folder}.tmp-{uuid.uuid4().hex}'
+    os.makedirs(tmp_folder)
+    meta = {'status': 'ready', 'source': source, 'page_size': PREVIEW_PAGE_ROWS}
+    try:
+        reader = ROW_READERS.get(extension)
+        if reader is None:
+            meta = {'status': 'unsupported', 'source': source}
+        else:
+            page, rows, total, columns, truncated = 0, [], 0, 0, False
+            for row in reader(path):
+                if total >= PREVIEW_MAX_ROWS:
+                    truncated = True
+                    break
+                row = _trim(row)
+                columns = max(columns, len(row))
+                rows.append(row)
+                total += 1
+                if len(rows) == PREVIEW_PAGE_ROWS:
+                    _write_json(os.path.join(tmp_folder, f'page-{page:04d}.json'), {'page': page, 'rows': rows})
+                    page, rows = page + 1, []
+            if rows or page == 0:
+                _write_json(os.path.join(tmp_folder, f'page-{page:04d}.json'), {'page': page, 'rows': rows})
+                page += 1
+            meta.update(pages=page, rows=total, columns=columns, truncated=truncated)
+    except Exception as e:
+        shutil.rmtree(tmp_folder, ignore_errors=True)
+        os.makedirs(tmp_folder)
+        meta = {'status': 'failed', 'source': source, 'error': str(e)}
+
+    _write_json(os.path.join(tmp_folder, 'meta.json'), meta)
+    try:
+        os.rename(tmp_folder, folder)
+    except OSError:
+        # Outro worker publicou a mesma pré-visualização antes
+        shutil.rmtree(tmp_folder, ignore_errors=True)
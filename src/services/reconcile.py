@@ -0,0 +1,417 @@
+import os
+import json
+import time
+import uuid
+import heapq
+import shutil
+from datetime import datetime
+from flask import current_app
+from src.models.user import db, File
+from src.services.blobstore import blob_lock
+from src.services.jobs import job_queue, job_handler, run_blocking
+from src.services.locks import file_lock
+from src.services.playlist import invalidate_playlist
+from src.services.previews import PREVIEWS_SUBFOLDER
+from src.services.storage import BLOB_SUBFOLDER, UPLOAD_SUBFOLDERS, storage_path
+from src.services.thumbnails import THUMBNAIL_SUFFIX, FAILED_SUFFIX
+
+# Reconciliação entre UPLOAD_FOLDER e a tabela File, feita em fatias: cada
+# execução processa lotes até o limite de tempo e grava o cursor em
+# STATE_FOLDER, de onde a próxima continua. Primeiro são percorridos os
+# arquivos (órfãos: sem registro File), depois as pastas de pré-visualização
+# e por fim os registros (sem arquivo).
+
+# Pastas de UPLOAD_FOLDER com arquivos enviados (inclusive os temporários de
+# blobs/tmp, deixados por uploads interrompidos); .state, .partial, previews
+# e a quarentena não são percorridas nessa fase
+STORAGE_ROOTS = tuple(sorted({BLOB_SUBFOLDER, *UPLOAD_SUBFOLDERS.values()}))
+
+QUARANTINE_SUBFOLDER = '.quarantine'
+
+# Arquivos gravados ao lado do arquivo enviado, que pertencem a ele
+SIDECAR_SUFFIXES = (THUMBNAIL_SUFFIX, FAILED_SUFFIX)
+
+# Relatórios de execuções anteriores mantidos em STATE_FOLDER/reconcile
+KEPT_REPORTS = 10
+
+# Espera entre fatias da tarefa em segundo plano (segundos)
+SLICE_DELAY = 1
+
+
+def _entry_batches(folder, start, batch_size):
+    """Entradas de uma pasta em ordem de nome, em lotes, a partir de ``start`` (inclusive)
+
+    Cada lote relê a pasta com scandir guardando só os ``batch_size`` menores
+    nomes, então a memória não depende do tamanho da pasta.
+    """
+    inclusive = True
+    while True:
+        try:
+            with os.scandir(folder) as entries:
+                batch = heapq.nsmallest(batch_size, (
+                    entry for entry in entries
+                    if start is None or entry.name > start or (inclusive and entry.name == start)
+                ), key=lambda entry: entry.name)
+        except (FileNotFoundError, NotADirectoryError):
+            return
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+        start, inclusive = batch[-1].name, False
+
+
+def _walk(folder, parts, cursor, batch_size):
+    """Arquivos abaixo de ``folder`` em ordem de caminho, depois de ``cursor`` (tupla de partes)"""
+    start = cursor[0] if cursor else None
+    for batch in _entry_batches(folder, start, batch_size):
+        for entry in batch:
+            if entry.name.startswith('.'):
+                # Locks (.lock) e pastas internas
+                continue
+            if not parts and entry.name not in STORAGE_ROOTS:
+                continue
+            resume = cursor[1:] if entry.name == start else ()
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk(entry.path, parts + (entry.name,), resume, batch_size)
+            elif entry.name != start and entry.is_file(follow_symlinks=False):
+                yield parts + (entry.name,), entry
+
+
+def scan_batch(upload_folder, cursor, batch_size):
+    """Próximos arquivos depois de ``cursor`` (caminho relativo): [(caminho, tamanho, mtime)]"""
+    files = []
+    cursor = tuple(cursor.split('/')) if cursor else ()
+    for parts, entry in _walk(upload_folder, (), cursor, batch_size):
+        try:
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        files.append(('/'.join(parts), stat.st_size, stat.st_mtime))
+        if len(files) >= batch_size:
+            break
+    return files
+
+
+def _folder_size(path):
+    size = 0
+    for folder, _, names in os.walk(path):
+        for name in names:
+            try:
+                size += os.stat(os.path.join(folder, name), follow_symlinks=False).st_size
+            except FileNotFoundError:
+                pass
+    return size
+
+
+def scan_previews_batch(upload_folder, cursor, batch_size):
+    """Próximas pastas de pré-visualização depois de ``cursor``: [(caminho, tamanho, mtime)]"""
+    folder = os.path.join(upload_folder, PREVIEWS_SUBFOLDER)
+    for batch in _entry_batches(folder, cursor, batch_size):
+        folders = []
+        for entry in batch:
+            if entry.name == cursor or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                mtime = entry.stat(follow_symlinks=False).st_mtime
+            except FileNotFoundError:
+                continue
+            folders.append((f'{PREVIEWS_SUBFOLDER}/{entry.name}', _folder_size(entry.path), mtime))
+        if folders:
+            return folders
+    return []
+
+
+def _owner(path):
+    """Nome do arquivo enviado (File.filename) a que um arquivo em disco pertence"""
+    name = path.rsplit('/', 1)[-1]
+    if path.startswith(f'{PREVIEWS_SUBFOLDER}/'):
+        # Pastas de pré-visualização têm o nome do arquivo; as antigas,
+        # indexadas pelo id do registro, e as temporárias de uma geração
+        # interrompida (<filename>.tmp-<uuid>) nunca correspondem a um registro
+        return name
+    for suffix in SIDECAR_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _missing_paths(paths):
+    return [path for path in paths if not os.path.exists(path)]
+
+
+def _move(source, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.replace(source, target)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _purge_quarantine(folder, max_age_days):
+    """Apaga quarentenas de execuções com mais de ``max_age_days`` dias"""
+    purged = 0
+    limit = time.time() - max_age_days * 86400
+    try:
+        entries = list(os.scandir(folder))
+    except FileNotFoundError:
+        return purged
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < limit:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            purged += 1
+    return purged
+
+
+class StorageReconciler:
+    """Compara os arquivos de UPLOAD_FOLDER com a tabela File, em fatias retomáveis
+
+    Arquivos sem registro (e suas miniaturas e pré-visualizações) e
+    temporários abandonados são órfãos; registros cujo
+    arquivo não existe estão pendentes. Sem ``apply`` tudo é apenas
+    relatado. Com ``apply``, órfãos vão para UPLOAD_FOLDER/.quarantine/<execução>
+    (mesma estrutura de pastas, para restauração manual) e registros pendentes
+    são desativados, saindo da playlist. Cada achado é anexado a um relatório
+    JSON Lines em STATE_FOLDER/reconcile; o estado da execução fica em
+    STATE_FOLDER/reconcile.json.
+    """
+
+    def __init__(self, app):
+        config = app.config
+        self.upload_folder = config['UPLOAD_FOLDER']
+        self.state_folder = config['STATE_FOLDER']
+        self.batch_size = config['RECONCILE_BATCH_SIZE']
+        self.min_age = config['RECONCILE_MIN_AGE']
+        self.batch_pause = config['RECONCILE_BATCH_PAUSE']
+        self.quarantine_days = config['RECONCILE_QUARANTINE_DAYS']
+
+    @property
+    def state_path(self):
+        return os.path.join(self.state_folder, 'reconcile.json')
+
+    @property
+    def reports_folder(self):
+        return os.path.join(self.state_folder, 'reconcile')
+
+    def report_path(self, state):
+        return os.path.join(self.reports_folder, f"{state['run_id']}.jsonl")
+
+    def load_state(self):
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save_state(self, state):
+        os.makedirs(self.state_folder, exist_ok=True)
+        with open(f'{self.state_path}.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(f'{self.state_path}.tmp', self.state_path)
+
+    def _new_state(self, previous, apply):
+        now = datetime.utcnow()
+        return {
+            'run_id': f"{now.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+            'apply': apply,
+            'phase': 'files',
+            'cursor': None,
+            'last_id': 0,
+            'started_at': now.isoformat(),
+            'finished_at': None,
+            # Contador global de fatias (chave de deduplicação da tarefa)
+            'slices': previous['slices'] if previous else 0,
+            'scanned_files': 0,
+            'scanned_rows': 0,
+            'orphans': 0,
+            'orphan_bytes': 0,
+            'quarantined': 0,
+            'dangling': 0,
+            'deactivated': 0,
+            'purged_quarantines': 0,
+        }
+
+    def _prune_reports(self):
+        try:
+            names = sorted(name for name in os.listdir(self.reports_folder) if name.endswith('.jsonl'))
+        except FileNotFoundError:
+            return
+        for name in names[:-KEPT_REPORTS]:
+            os.remove(os.path.join(self.reports_folder, name))
+
+    def run(self, apply=False, max_seconds=None, restart=False):
+        """Executa uma fatia (ou a execução inteira, sem ``max_seconds``) e retorna o estado
+
+        Uma execução concluída é recomeçada do início na chamada seguinte, assim
+        como uma execução iniciada no outro modo (apenas relatório ou ``apply``):
+        os achados anteriores ao cursor não seriam revisitados.
+        """
+        with file_lock(os.path.join(self.state_folder, 'reconcile.lock')):
+            state = self.load_state()
+            if state is None or restart or state['phase'] == 'done' or state['apply'] != apply:
+                state = self._new_state(state, apply)
+                os.makedirs(self.reports_folder, exist_ok=True)
+                self._prune_reports()
+            state['slices'] += 1
+
+            deadline = None if max_seconds is None else time.monotonic() + max_seconds
+            with open(self.report_path(state), 'a') as report:
+                while state['phase'] != 'done':
+                    if state['phase'] == 'files':
+                        self._files_batch(state, apply, report)
+                    elif state['phase'] == 'previews':
+                        self._previews_batch(state, apply, report)
+                    else:
+                        self._rows_batch(state, apply, report)
+                    report.flush()
+                    self._save_state(state)
+                    if deadline is not None and time.monotonic() >= deadline:
+                        break
+                    if self.batch_pause:
+                        time.sleep(self.batch_pause)
+
+            if state['phase'] == 'done':
+                if apply and self.quarantine_days > 0:
+                    state['purged_quarantines'] = run_blocking(
+                        _purge_quarantine, os.path.join(self.upload_folder, QUARANTINE_SUBFOLDER),
+                        self.quarantine_days
+                    )
+                state['finished_at'] = datetime.utcnow().isoformat()
+                self._save_state(state)
+            return state
+
+    def _files_batch(self, state, apply, report):
+        files = run_blocking(scan_batch, self.upload_folder, state['cursor'], self.batch_size)
+        if not files:
+            state['phase'], state['cursor'] = 'previews', None
+            return
+        self._check_orphans(state, files, apply, report)
+        state['scanned_files'] += len(files)
+        state['cursor'] = files[-1][0]
+
+    def _previews_batch(self, state, apply, report):
+        folders = run_blocking(scan_previews_batch, self.upload_folder, state['cursor'], self.batch_size)
+        if not folders:
+            state['phase'], state['cursor'] = 'rows', None
+            return
+        self._check_orphans(state, folders, apply, report)
+        state['scanned_files'] += len(folders)
+        state['cursor'] = folders[-1][0].rsplit('/', 1)[-1]
+
+    def _check_orphans(self, state, files, apply, report):
+        """Relata (e com ``apply`` coloca em quarentena) os caminhos sem registro File"""
+        owners = {_owner(path) for path, _, _ in files}
+        referenced = {
+            filename for (filename,) in
+            db.session.query(File.filename).filter(File.filename.in_(owners)).distinct()
+        }
+        db.session.rollback()
+
+        # Arquivos recentes podem pertencer a um upload cujo registro ainda não foi gravado
+        limit = time.time() - self.min_age
+        for path, size, mtime in files:
+            owner = _owner(path)
+            if owner in referenced or mtime > limit:
+                continue
+            state['orphans'] += 1
+            state['orphan_bytes'] += size
+            action = 'reported'
+            if apply and self._quarantine(state, path, owner):
+                state['quarantined'] += 1
+                action = 'quarantined'
+            report.write(json.dumps({'kind': 'orphan', 'path': path, 'size': size, 'action': action}) + '\n')
+
+    def _quarantine(self, state, path, owner):
+        """Move um órfão para a quarentena, conferindo de novo sob o lock do blob"""
+        source = os.path.join(self.upload_folder, *path.split('/'))
+        target = os.path.join(self.upload_folder, QUARANTINE_SUBFOLDER, state['run_id'], *path.split('/'))
+        with blob_lock(owner):
+            if db.session.query(File.id).filter(File.filename == owner).first() is not None:
+                db.session.rollback()
+                return False
+            db.session.rollback()
+            return run_blocking(_move, source, target)
+
+    def _rows_batch(self, state, apply, report):
+        rows = db.session.query(File.id, File.filename, File.file_type, File.is_active).filter(
+            File.id > state['last_id']
+        ).order_by(File.id).limit(self.batch_size).all()
+        db.session.rollback()
+        if not rows:
+            state['phase'] = 'done'
+            return
+
+        paths = {row.id: storage_path(row.file_type, row.filename) for row in rows}
+        missing = set(run_blocking(_missing_paths, list(paths.values())))
+        dangling = [row for row in rows if paths[row.id] in missing]
+
+        deactivated = set()
+        if apply and dangling:
+            deactivated = self._deactivate([row.id for row in dangling if row.is_active])
+        for row in dangling:
+            state['dangling'] += 1
+            action = 'deactivated' if row.id in deactivated else 'reported'
+            report.write(json.dumps({
+                'kind': 'dangling', 'file_id': row.id, 'filename': row.filename, 'action': action
+            }) + '\n')
+
+        state['deactivated'] += len(deactivated)
+        state['scanned_rows'] += len(rows)
+        state['last_id'] = rows[-1].id
+
+    def _deactivate(self, file_ids):
+        """Desativa registros sem arquivo, conferindo de novo o caminho atual de cada um
+
+        Uma reescrita (fast start) pode ter trocado o blob de um registro entre
+        a consulta e a verificação em disco.
+        """
+        if not file_ids:
+            return set()
+        rows = db.session.query(File.id, File.filename, File.file_type).filter(File.id.in_(file_ids)).all()
+        paths = {row.id: storage_path(row.file_type, row.filename) for row in rows}
+        missing = set(run_blocking(_missing_paths, list(paths.values())))
+        ids = [file_id for file_id, path in paths.items() if path in missing]
+        if ids:
+            File.query.filter(File.id.in_(ids), File.is_active.is_(True)).update(
+                {'is_active': False}, synchronize_session=False
+            )
+        db.session.commit()
+        if ids:
+            invalidate_playlist()
+        return set(ids)
+
+
+def reconcile_storage(apply=False, max_seconds=None, restart=False):
+    """Executa a reconciliação com a configuração do app atual (ver StorageReconciler)"""
+    return StorageReconciler(current_app).run(apply=apply, max_seconds=max_seconds, restart=restart)
+
+
+def reconcile_state():
+    """Estado da última execução (ou da execução em andamento), ou None"""
+    return StorageReconciler(current_app).load_state()
+
+
+def schedule_reconcile(apply=False, delay=0):
+    """Agenda uma fatia da reconciliação na fila de tarefas (chamar antes do commit)
+
+    A chave usa o contador de fatias do estado: pedidos repetidos antes da
+    próxima fatia são deduplicados.
+    """
+    state = reconcile_state()
+    slices = state['slices'] if state else 0
+    return job_queue.enqueue(
+        'reconcile_storage', {'apply': apply}, key=f'reconcile:{slices}', delay=delay
+    )
+
+
+@job_handler('reconcile_storage')
+def reconcile_storage_task(payload):
+    config = current_app.config
+    state = reconcile_storage(apply=payload.get('apply', False), max_seconds=config['RECONCILE_SLICE_SECONDS'])
+    if state['phase'] != 'done':
+        schedule_reconcile(payload.get('apply', False), delay=SLICE_DELAY)
+    elif config['RECONCILE_INTERVAL'] > 0:
+        schedule_reconcile(payload.get('apply', False), delay=config['RECONCILE_INTERVAL'])
+    db.session.commit()
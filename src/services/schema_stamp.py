@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import hashlib
+
+# Só biblioteca padrão (e o driver do PostgreSQL, se houver): este módulo é
+# lido pelo master do gunicorn (gunicorn.conf.py), que não deve importar o app
+# nem o SQLAlchemy
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Arquivos que definem o esquema e os dados iniciais: qualquer alteração
+# neles faz o init-db rodar de novo na próxima partida
+SCHEMA_SOURCES = (
+    'src/models/user.py',
+    'src/models/schema.py',
+    'src/services/settings.py',
+    'src/services/bootstrap.py',
+)
+
+STAMP_NAME = 'init-db.stamp'
+
+# Tabela cuja existência indica que o init-db já criou o esquema neste banco
+SCHEMA_TABLE = 'file'
+
+
+def schema_fingerprint():
+    """Hash do banco configurado e do código que define seu esquema"""
+    digest = hashlib.sha256(os.environ.get('DATABASE_URL', '').encode())
+    for name in SCHEMA_SOURCES:
+        with open(os.path.join(ROOT, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def stamp_path(state_folder):
+    return os.path.join(state_folder, STAMP_NAME)
+
+
+def _database_url():
+    # Mesmo padrão de app.py (SQLite em database/app.db)
+    return os.environ.get('DATABASE_URL') or f"sqlite:///{os.path.join(ROOT, 'database', 'app.db')}"
+
+
+def _sqlite_has_table(url, table):
+    path = url.split(':///', 1)[1] if ':///' in url else ''
+    if not path or path == ':memory:':
+        return False
+    if not os.path.isabs(path):
+        # O Flask-SQLAlchemy resolve caminhos relativos na pasta instance do app
+        path = os.path.join(ROOT, 'instance', path)
+    if not os.path.exists(path):
+        return False
+    connection = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        row = connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()
+    finally:
+        connection.close()
+    return row is not None
+
+
+def _postgresql_has_table(url, table):
+    import psycopg2
+    # postgresql+psycopg2://... (URL do SQLAlchemy) -> postgresql://...
+    scheme, rest = url.split('://', 1)
+    connection = psycopg2.connect(f"{scheme.split('+', 1)[0]}://{rest}", connect_timeout=10)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL', (table,))
+            return cursor.fetchone()[0]
+    finally:
+        connection.close()
+
+
+def schema_present(table=SCHEMA_TABLE):
+    """Indica se o banco configurado já tem as tabelas do app
+
+    O carimbo sozinho não basta: o banco pode ter sido recriado (ou o
+    DATABASE_URL apontar para um banco novo com o mesmo endereço) depois do
+    último init-db. Na dúvida (driver ausente, banco inacessível) retorna
+    False, e o init-db, que é idempotente, roda.
+    """
+    url = _database_url()
+    try:
+        if url.startswith('sqlite:'):
+            return _sqlite_has_table(url, table)
+        if url.startswith(('postgres://', 'postgresql')):
+            return _postgresql_has_table(url, table)
+    except Exception:
+        return False
+    return False
+
+
+def is_initialized(state_folder):
+    """Indica se o init-db já rodou com o esquema atual neste banco
+
+    Exige o carimbo do esquema atual e a tabela principal no banco.
+    """
+    try:
+        with open(stamp_path(state_folder)) as f:
+            if f.read().strip() != schema_fingerprint():
+                return False
+    except FileNotFoundError:
+        return False
+    return schema_present()
+
+
+def write_stamp(state_folder):
+    os.makedirs(state_folder, exist_ok=True)
+    tmp_path = f'{stamp_path(state_folder)}.{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        f.write(schema_fingerprint())
+    os.replace(tmp_path, stamp_path(state_folder))
@@ -0,0 +1,47 @@
+import os
+import importlib.util
+
+# Escolha do tipo de worker do gunicorn. Sem dependências além da biblioteca
+# padrão: é importado pelo gunicorn.conf.py no master, antes do fork e do
+# monkey patching do gevent.
+
+
+def uses_postgresql(environ=None):
+    url = (os.environ if environ is None else environ).get('DATABASE_URL', '')
+    return url.startswith(('postgres://', 'postgresql'))
+
+
+def cooperative_database(environ=None):
+    """Indica se as consultas ao banco liberam o loop do gevent enquanto esperam
+
+    Só o psycopg2 com o callback de espera do psycogreen coopera; o sqlite3 e
+    o psycopg2 sem patch bloqueiam o worker inteiro durante cada consulta.
+    """
+    return uses_postgresql(environ) and importlib.util.find_spec('psycogreen') is not None
+
+
+def default_worker_class(environ=None):
+    """gevent com PostgreSQL e psycogreen; gthread nos demais casos (ex.: SQLite)"""
+    return 'gevent' if cooperative_database(environ) else 'gthread'
+
+
+def worker_class(environ=None):
+    """Tipo de worker configurado (GUNICORN_WORKER_CLASS) ou o padrão para o banco
+
+    ``environ`` permite avaliar outro ambiente (ex.: o de um subprocesso);
+    o padrão é ``os.environ``.
+    """
+    environ = os.environ if environ is None else environ
+    return environ.get('GUNICORN_WORKER_CLASS') or default_worker_class(environ)
+
+
+def patch_database_driver():
+    """Torna o psycopg2 cooperativo com o gevent (chamar no worker, após o fork)"""
+    if not uses_postgresql():
+        return False
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        return False
+    patch_psycopg()
+    return True
@@ -0,0 +1,147 @@
+import threading
+from src.models.user import db, Settings
+from src.services.versioning import SharedCounter
+
+# Configurações conhecidas: tipo, valor padrão e descrição
+DEFAULT_SETTINGS = {
+    'default_display_time': (int, '10', 'Tempo padrão de exibição em segundos'),
+    'auto_rotation': (bool, 'true', 'Rotação automática ativada'),
+    'app_title': (str, 'Dashboard App', 'Título da aplicação'),
+}
+
+TRUE_VALUES = {'true', '1', 'yes', 'on', 'sim'}
+FALSE_VALUES = {'false', '0', 'no', 'off', 'nao', 'não'}
+
+MAX_TEXT_LENGTH = 255
+
+# Versão das configurações, incrementada a cada alteração (compartilhada entre workers)
+settings_version = SharedCounter('settings')
+
+
+class InvalidSetting(ValueError):
+    """Valor inválido para uma configuração"""
+
+
+def parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise InvalidSetting(f'Valor booleano inválido: {value}')
+
+
+def normalize(key, value):
+    """Valida o valor de uma configuração conhecida e retorna sua forma armazenada (texto)"""
+    kind = DEFAULT_SETTINGS[key][0] if key in DEFAULT_SETTINGS else str
+    if kind is bool:
+        return 'true' if parse_bool(value) else 'false'
+    if kind is int:
+        try:
+            number = int(value)
+        except (TypeError, ValueError):
+            raise InvalidSetting(f'{key}: número inteiro esperado')
+        if number < 1:
+            raise InvalidSetting(f'{key}: valor deve ser maior que zero')
+        return str(number)
+    text = str(value).strip()
+    if not text or len(text) > MAX_TEXT_LENGTH:
+        raise InvalidSetting(f'{key}: texto deve ter entre 1 e {MAX_TEXT_LENGTH} caracteres')
+    return text
+
+
+class SettingsCache:
+    """Configurações carregadas uma vez por processo e recarregadas quando a versão muda
+
+    A leitura custa um stat() do arquivo de versão; o banco só é consultado
+    depois de uma alteração feita por qualquer worker.
+    """
+
+    def __init__(self, counter):
+        self.counter = counter
+        self._lock = threading.Lock()
+        self._version = None
+        self._values = {}
+
+    def _current(self):
+        version = self.counter.value()
+        if version == self._version:
+            return self._values
+
+        with self._lock:
+            if version != self._version:
+                # A versão é lida antes da consulta: uma alteração concorrente
+                # gera uma versão nova e um novo carregamento
+                self._values = dict(db.session.query(Settings.key, Settings.value).all())
+                self._version = version
+            return self._values
+
+    @property
+    def version(self):
+        self._current()
+        return self._version
+
+    def get(self, key, default=None):
+        """Valor bruto (texto) da configuração"""
+        return self._current().get(key, default)
+
+    def get_str(self, key, default=None):
+        value = self.get(key)
+        return default if value is None else value
+
+    def get_int(self, key, default=None):
+        try:
+            return int(self.get(key))
+        except (TypeError, ValueError):
+            return default
+
+    def get_bool(self, key, default=None):
+        try:
+            return parse_bool(self.get(key))
+        except (TypeError, InvalidSetting):
+            return default
+
+    def typed(self):
+        """Todas as configurações com os tipos das conhecidas (int, bool, str)"""
+        values = dict(self._current())
+        for key, (kind, default, _) in DEFAULT_SETTINGS.items():
+            if kind is int:
+                values[key] = self.get_int(key, int(default))
+            elif kind is bool:
+                values[key] = self.get_bool(key, parse_bool(default))
+            else:
+                values[key] = self.get_str(key, default)
+        return values
+
+    def update(self, changes):
+        """Grava alterações ({chave: valor}), valida os tipos e avisa os demais workers
+
+        Apenas configurações existentes podem ser alteradas. Faz o commit.
+        """
+        normalized = {key: normalize(key, value) for key, value in changes.items()}
+        settings = Settings.query.filter(Settings.key.in_(normalized.keys())).all()
+        missing = set(normalized) - {setting.key for setting in settings}
+        if missing:
+            raise KeyError(', '.join(sorted(missing)))
+
+        for setting in settings:
+            setting.value = normalized[setting.key]
+        db.session.commit()
+        self.counter.bump()
+
+
+settings_cache = SettingsCache(settings_version)
+
+
+def create_default_settings():
+    """Cria as configurações padrão que ainda não existem"""
+    existing = {key for (key,) in db.session.query(Settings.key).all()}
+    missing = [key for key in DEFAULT_SETTINGS if key not in existing]
+    for key in missing:
+        _, value, description = DEFAULT_SETTINGS[key]
+        db.session.add(Settings(key=key, value=value, description=description))
+    db.session.commit()
+    if missing:
+        settings_version.bump()
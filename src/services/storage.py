@@ -0,0 +1,45 @@
+import os
+import re
+from flask import current_app
+
+# Subpasta de destino para cada tipo de arquivo (arquivos anteriores ao
+# armazenamento por conteúdo, com nomes uuid4)
+UPLOAD_SUBFOLDERS = {
+    'video': 'videos',
+    'document': 'documents',
+    'pdf': 'pdfs'
+}
+
+# Pasta do armazenamento endereçado por conteúdo (SHA-256)
+BLOB_SUBFOLDER = 'blobs'
+
+BLOB_NAME_PATTERN = re.compile(r'^([0-9a-f]{64})\.[a-z0-9]+$')
+
+
+def storage_folder(file_type):
+    """Retorna a pasta onde arquivos do tipo informado eram armazenados"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], UPLOAD_SUBFOLDERS[file_type])
+
+
+def blob_folder():
+    """Retorna a raiz do armazenamento por conteúdo"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], BLOB_SUBFOLDER)
+
+
+def blob_digest(filename):
+    """Retorna o SHA-256 contido no nome de um blob ou None para nomes antigos"""
+    match = BLOB_NAME_PATTERN.match(filename)
+    return match.group(1) if match else None
+
+
+def blob_path(filename):
+    """Caminho de um blob, distribuído em dois níveis de subpastas (ab/cd/abcd...)"""
+    digest = blob_digest(filename)
+    return os.path.join(blob_folder(), digest[:2], digest[2:4], filename)
+
+
+def storage_path(file_type, filename):
+    """Retorna o caminho em disco de um arquivo enviado"""
+    if blob_digest(filename):
+        return blob_path(filename)
+    return os.path.join(storage_folder(file_type), filename)
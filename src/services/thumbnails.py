@@ -0,0 +1,132 @@
+import os
+import uuid
+import shutil
+import subprocess
+
+# Miniatura gravada ao lado do arquivo enviado
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+
+# Marcador de geração que falhou (evita tentar de novo a cada requisição)
+FAILED_SUFFIX = '.thumb.failed'
+
+THUMBNAIL_WIDTH = 320
+
+# Tempo máximo da ferramenta externa por arquivo (segundos)
+THUMBNAIL_TIMEOUT = 60
+
+# A miniatura de um arquivo nunca muda (nome derivado do conteúdo)
+THUMBNAIL_CACHE_MAX_AGE = 365 * 24 * 3600
+
+# Ícone substituto: cache curto para a miniatura real aparecer quando ficar pronta
+PLACEHOLDER_CACHE_MAX_AGE = 300
+
+PLACEHOLDER_STYLES = {
+    'video': ('#e74c3c', 'VÍDEO'),
+    'pdf': ('#e67e22', 'PDF'),
+    'document': ('#27ae60', 'PLANILHA'),
+}
+
+
+def thumbnail_path(file_path):
+    return file_path + THUMBNAIL_SUFFIX
+
+
+def thumbnail_tool(file_type):
+    """Ferramenta local usada para gerar a miniatura do tipo, ou None se indisponível"""
+    if file_type == 'pdf':
+        return shutil.which('pdftoppm')
+    if file_type == 'video':
+        return shutil.which('ffmpeg')
+    return None
+
+
+def _run(command):
+    subprocess.run(
+        command,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        timeout=THUMBNAIL_TIMEOUT,
+        check=True
+    )
+
+
+def _render_pdf(tool, file_path, tmp_prefix):
+    # Primeira página em JPEG, com a largura limitada
+    _run([tool, '-jpeg', '-f', '1', '-l', '1', '-scale-to', str(THUMBNAIL_WIDTH),
+          '-singlefile', file_path, tmp_prefix])
+    return f'{tmp_prefix}.jpg'
+
+
+def _render_video(tool, file_path, tmp_prefix):
+    output = f'{tmp_prefix}.jpg'
+    # Quadro em 1s (evita telas pretas de abertura); vídeos curtos usam o primeiro quadro
+    for position in ('1', '0'):
+        try:
+            _run([tool, '-v', 'error', '-ss', position, '-i', file_path, '-frames:v', '1',
+                  '-vf', f'scale={THUMBNAIL_WIDTH}:-2', '-f', 'image2', '-y', output])
+        except subprocess.CalledProcessError:
+            continue
+        if os.path.exists(output) and os.path.getsize(output) > 0:
+            break
+    return output
+
+
+def generate_thumbnail(file_path, file_type):
+    """Gera a miniatura de um PDF (primeira página) ou vídeo (quadro de capa)
+
+    Retorna True se a miniatura existir ao final. A imagem é gerada em um
+    temporário e publicada com rename; em caso de falha fica um marcador
+    para não repetir a tentativa.
+    """
+    destination = thumbnail_path(file_path)
+    if os.path.exists(destination):
+        return True
+
+    tool = thumbnail_tool(file_type)
+    if tool is None:
+        return False
+
+    tmp_prefix = f'{destination}.{uuid.uuid4().hex}'
+    render = _render_pdf if file_type == 'pdf' else _render_video
+    output = f'{tmp_prefix}.jpg'
+    try:
+        output = render(tool, file_path, tmp_prefix)
+        if os.path.getsize(output) == 0:
+            raise OSError('Miniatura vazia')
+        os.replace(output, destination)
+        return True
+    except (OSError, subprocess.SubprocessError):
+        open(file_path + FAILED_SUFFIX, 'w').close()
+        return False
+    finally:
+        if os.path.exists(output):
+            os.remove(output)
+
+
+def needs_thumbnail(file_path, file_type):
+    """Indica se a miniatura pode ser gerada e ainda não existe (nem falhou antes)"""
+    if thumbnail_tool(file_type) is None:
+        return False
+    return not (os.path.exists(thumbnail_path(file_path)) or os.path.exists(file_path + FAILED_SUFFIX))
+
+
+def discard_thumbnail(file_path):
+    """Remove a miniatura (e o marcador de falha) de um arquivo removido"""
+    for path in (thumbnail_path(file_path), file_path + FAILED_SUFFIX):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def placeholder_svg(file_type):
+    """Ícone substituto (SVG) para arquivos sem miniatura"""
+    color, label = PLACEHOLDER_STYLES.get(file_type, ('#6c757d', 'ARQUIVO'))
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{THUMBNAIL_WIDTH}" height="180" '
+        f'viewBox="0 0 320 180"><rect width="320" height="180" fill="#f8f9fa"/>'
+        f'<rect x="130" y="45" width="60" height="75" rx="6" fill="{color}"/>'
+        f'<text x="160" y="150" font-family="sans-serif" font-size="16" font-weight="bold" '
+        f'fill="{color}" text-anchor="middle">{label}</text></svg>'
+    )
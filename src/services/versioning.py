@@ -0,0 +1,56 @@
+import os
+import threading
+from flask import current_app
+from src.services.locks import file_lock
+
+
+class SharedCounter:
+    """Contador monotônico compartilhado entre os workers do gunicorn
+
+    O valor fica em um pequeno arquivo em STATE_FOLDER. Cada incremento grava um
+    arquivo novo e o substitui atomicamente, então a leitura só precisa de um
+    stat() enquanto o valor não muda — nenhuma consulta ao banco.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._key = None
+        self._value = 0
+
+    def _path(self):
+        return os.path.join(current_app.config['STATE_FOLDER'], f'{self.name}.version')
+
+    def value(self):
+        """Retorna o valor atual do contador"""
+        path = self._path()
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return 0
+
+        key = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if key != self._key:
+            try:
+                with open(path) as f:
+                    value = int(f.read() or 0)
+            except (FileNotFoundError, ValueError):
+                return self._value
+            self._key, self._value = key, value
+        return self._value
+
+    def bump(self):
+        """Incrementa o contador e retorna o novo valor"""
+        path = self._path()
+        with self._lock, file_lock(f'{path}.lock'):
+            try:
+                with open(path) as f:
+                    value = int(f.read() or 0) + 1
+            except (FileNotFoundError, ValueError):
+                value = 1
+
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(str(value))
+            os.replace(tmp_path, path)
+        return value
@@ -6,13 +6,45 @@ let isPlaying = true;
 let displayTimer = null;
 let progressTimer = null;
 let currentDisplayTime = 10;
+const FILES_PAGE_SIZE = 50;
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024; // arquivos maiores usam upload em blocos
+const MAX_CHUNK_RETRIES = 5;
+let playlistEvents = null;
+let eventVersions = null;
+let filesCursor = null;
+let appSettings = null;
+let nextPrefetch = null; // próximo item da rotação já em carregamento
 
 // Inicialização
 document.addEventListener('DOMContentLoaded', function() {
+    loadSettings();
     checkSession();
     setupEventListeners();
 });
 
+// Configurações da aplicação (título, rotação automática, tempo padrão)
+async function loadSettings() {
+    try {
+        const response = await fetch('/api/settings');
+        if (!response.ok) return;
+        
+        const settings = await response.json();
+        const previous = appSettings;
+        appSettings = settings;
+        
+        document.title = settings.app_title;
+        document.querySelector('.nav-brand span').textContent = settings.app_title;
+        document.getElementById('displayTime').value = settings.default_display_time;
+        
+        // Rotação automática: aplicar no carregamento e quando a configuração mudar
+        if ((!previous || previous.auto_rotation !== settings.auto_rotation) && isPlaying !== settings.auto_rotation) {
+            togglePlayPause();
+        }
+    } catch (error) {
+        console.error('Erro ao carregar configurações:', error);
+    }
+}
+
 // Event Listeners
 function setupEventListeners() {
     // Login form
@@ -45,6 +77,7 @@ async function checkSession() {
             currentUser = data.user;
             showMainApp();
             loadActiveFiles();
+            subscribePlaylistEvents();
         } else {
             showLoginModal();
         }
@@ -79,6 +112,7 @@ async function handleLogin(event) {
             hideLoginModal();
             showMainApp();
             loadActiveFiles();
+            subscribePlaylistEvents();
         } else {
             showError('loginError', data.error);
         }
@@ -92,6 +126,7 @@ async function logout() {
     try {
         await fetch('/api/auth/logout', { method: 'POST' });
         currentUser = null;
+        unsubscribePlaylistEvents();
         stopDisplay();
         showLoginModal();
         hideMainApp();
@@ -166,15 +201,30 @@ async function loadActiveFiles() {
         const data = await response.json();
         
         if (response.ok) {
+            // Manter o arquivo atual em exibição se ele continuar na playlist
+            const current = currentFiles[currentFileIndex];
+            const index = current ? data.findIndex(file => file.id === current.id) : -1;
+            
             currentFiles = data;
-            currentFileIndex = 0;
+            currentFileIndex = Math.max(index, 0);
             
             if (currentFiles.length > 0) {
-                displayCurrentFile();
-                if (isPlaying) {
-                    startAutoRotation();
+                if (index < 0) {
+                    stopAutoRotation();
+                    stopProgressTimer();
+                    displayCurrentFile();
+                    if (isPlaying) {
+                        startAutoRotation();
+                    }
+                } else {
+                    // A playlist mudou: o próximo item pode ser outro
+                    prefetchNextFile();
+                    if (isPlaying && !displayTimer) {
+                        startAutoRotation();
+                    }
                 }
             } else {
+                stopDisplay();
                 showNoFiles();
             }
         }
@@ -184,6 +234,40 @@ async function loadActiveFiles() {
     }
 }
 
+// Recebe alterações da playlist por Server-Sent Events
+function subscribePlaylistEvents() {
+    if (playlistEvents || !window.EventSource) return;
+    
+    playlistEvents = new EventSource('/api/files/events');
+    // Enviado a cada conexão; em workers sem gevent o servidor encerra o stream
+    // logo depois e o navegador reconecta, então a comparação das versões
+    // substitui os eventos (polling)
+    playlistEvents.addEventListener('hello', function(event) {
+        const versions = JSON.parse(event.data);
+        if (eventVersions) {
+            if (versions.playlist !== eventVersions.playlist) loadActiveFiles();
+            if (versions.settings !== eventVersions.settings) loadSettings();
+        }
+        eventVersions = versions;
+    });
+    playlistEvents.addEventListener('playlist', function(event) {
+        eventVersions = Object.assign({}, eventVersions, {playlist: JSON.parse(event.data).version});
+        loadActiveFiles();
+    });
+    playlistEvents.addEventListener('settings', function(event) {
+        eventVersions = Object.assign({}, eventVersions, {settings: JSON.parse(event.data).version});
+        loadSettings();
+    });
+}
+
+function unsubscribePlaylistEvents() {
+    if (playlistEvents) {
+        playlistEvents.close();
+        playlistEvents = null;
+        eventVersions = null;
+    }
+}
+
 function displayCurrentFile() {
     if (currentFiles.length === 0) {
         showNoFiles();
@@ -203,9 +287,12 @@ function displayCurrentFile() {
     // Criar elemento baseado no tipo de arquivo
     let content;
     
+    const prefetched = takePrefetch(file);
+    
     if (file.file_type === 'video') {
-        content = document.createElement('video');
-        content.src = `/api/serve/${file.filename}`;
+        // Reaproveitar o elemento pré-carregado durante o item anterior
+        content = prefetched && prefetched.video ? prefetched.video : document.createElement('video');
+        if (!content.src) content.src = `/api/serve/${file.filename}`;
         content.controls = true;
         content.autoplay = true;
         content.muted = true; // Para permitir autoplay
@@ -227,12 +314,124 @@ function displayCurrentFile() {
                 </a>
             </div>
         `;
+        loadDocumentPreview(file, content, prefetched && prefetched.preview);
     }
     
     fileDisplay.appendChild(content);
+    if (content.tagName === 'VIDEO' && content.paused) {
+        content.play().catch(() => {});
+    }
     
     // Iniciar timer de progresso
     startProgressTimer();
+    
+    // Aquecer o próximo item enquanto este é exibido
+    prefetchNextFile();
+}
+
+// Pré-carregamento do próximo item conforme o plano enviado pelo servidor
+function prefetchNextFile() {
+    if (currentFiles.length <= 1) return;
+    
+    const next = currentFiles[(currentFileIndex + 1) % currentFiles.length];
+    if (nextPrefetch && nextPrefetch.id === next.id && nextPrefetch.filename === next.filename) return;
+    discardPrefetch();
+    
+    const plan = next.prefetch || {};
+    const prefetch = { id: next.id, filename: next.filename };
+    if (plan.as === 'video') {
+        // Elemento oculto: o navegador baixa o índice e os primeiros segundos
+        const video = document.createElement('video');
+        video.preload = 'auto';
+        video.muted = true;
+        video.src = plan.url;
+        video.load();
+        prefetch.video = video;
+    } else if (next.file_type === 'document') {
+        prefetch.preview = fetchDocumentPreview(next);
+    } else if (plan.as === 'fetch') {
+        // Download completo: o iframe do PDF encontra o arquivo no cache HTTP
+        fetch(plan.url).then(response => response.blob()).catch(() => {});
+    } else {
+        return;
+    }
+    nextPrefetch = prefetch;
+}
+
+// Retorna o pré-carregamento do arquivo (se houver) e libera os demais
+function takePrefetch(file) {
+    const prefetch = nextPrefetch;
+    nextPrefetch = null;
+    if (prefetch && prefetch.id === file.id && prefetch.filename === file.filename) {
+        return prefetch;
+    }
+    releasePrefetch(prefetch);
+    return null;
+}
+
+function discardPrefetch() {
+    releasePrefetch(nextPrefetch);
+    nextPrefetch = null;
+}
+
+function releasePrefetch(prefetch) {
+    if (prefetch && prefetch.video) {
+        prefetch.video.removeAttribute('src');
+        prefetch.video.load(); // interrompe o download
+    }
+}
+
+// Pré-visualização de planilhas: primeira página gerada no servidor
+async function fetchDocumentPreview(file) {
+    try {
+        const response = await fetch(`/api/files/${file.id}/preview`);
+        if (response.status !== 200) return null; // ainda sendo gerada ou indisponível
+        
+        const meta = await response.json();
+        if (meta.status !== 'ready' || meta.rows === 0) return null;
+        
+        const pageResponse = await fetch(`/api/files/${file.id}/preview/0?v=${encodeURIComponent(meta.source)}`);
+        if (!pageResponse.ok) return null;
+        return { meta, page: await pageResponse.json() };
+    } catch (error) {
+        console.error('Erro ao carregar pré-visualização:', error);
+        return null;
+    }
+}
+
+async function loadDocumentPreview(file, container, pending = null) {
+    try {
+        // Pré-carregada durante o item anterior (ou ainda não pronta naquele momento)
+        let preview = pending ? await pending : null;
+        if (!preview) preview = await fetchDocumentPreview(file);
+        
+        // O arquivo em exibição pode ter mudado durante o carregamento
+        if (!preview || !container.isConnected) return;
+        const { meta, page } = preview;
+        
+        const table = document.createElement('table');
+        table.className = 'preview-table';
+        page.rows.forEach((row, index) => {
+            const tr = document.createElement('tr');
+            for (let i = 0; i < meta.columns; i++) {
+                const cell = document.createElement(index === 0 ? 'th' : 'td');
+                cell.textContent = row[i] || '';
+                tr.appendChild(cell);
+            }
+            (index === 0 ? table.createTHead() : (table.tBodies[0] || table.createTBody())).appendChild(tr);
+        });
+        
+        const footer = document.createElement('p');
+        footer.className = 'preview-info';
+        footer.textContent = `${meta.rows} linhas${meta.truncated ? ' (pré-visualização limitada)' : ''}`;
+        
+        const wrapper = document.createElement('div');
+        wrapper.className = 'document-table';
+        wrapper.append(table, footer);
+        container.replaceChildren(wrapper);
+    } catch (error) {
+        console.error('Erro ao carregar pré-visualização:', error);
+    }
 }
 
 function showNoFiles() {
@@ -337,17 +536,25 @@ function previousFile() {
 function stopDisplay() {
     stopAutoRotation();
     stopProgressTimer();
+    discardPrefetch();
 }
 
 // Gerenciamento de arquivos
-async function loadFiles() {
+async function loadFiles(append = false) {
     try {
         showLoading();
-        const response = await fetch('/api/files');
+        const params = new URLSearchParams({ limit: FILES_PAGE_SIZE });
+        if (append && filesCursor) {
+            params.set('cursor', filesCursor);
+            params.set('count', 'false');
+        }
+        
+        const response = await fetch(`/api/files?${params}`);
         const data = await response.json();
         
         if (response.ok) {
-            displayFiles(data);
+            filesCursor = data.next_cursor;
+            displayFiles(data.files, append);
         } else {
             console.error('Erro ao carregar arquivos:', data.error);
         }
@@ -358,16 +565,20 @@ async function loadFiles() {
     }
 }
 
-function displayFiles(files) {
+function displayFiles(files, append = false) {
     const grid = document.getElementById('filesGrid');
+    const loadMore = document.getElementById('loadMoreFiles');
     
-    if (files.length === 0) {
+    loadMore.style.display = filesCursor ? 'inline-flex' : 'none';
+    
+    if (!append && files.length === 0) {
         grid.innerHTML = '<p>Nenhum arquivo encontrado.</p>';
         return;
     }
     
-    grid.innerHTML = files.map(file => `
+    const html = files.map(file => `
         <div class="file-card ${file.is_active ? 'active' : 'inactive'}">
+            <img class="file-thumb" src="/api/thumbnails/${file.filename}" loading="lazy" alt="">
             <div class="file-header">
                 <div>
                     <i class="fas ${getFileIcon(file.file_type)} file-icon ${file.file_type}"></i>
@@ -413,6 +624,12 @@ function displayFiles(files) {
             </div>
         </div>
     `).join('');
+    
+    if (append) {
+        grid.insertAdjacentHTML('beforeend', html);
+    } else {
+        grid.innerHTML = html;
+    }
 }
 
 function getFileIcon(type) {
@@ -456,25 +673,33 @@ async function handleUpload(event) {
     const progressFill = document.getElementById('uploadProgressFill');
     const progressText = document.getElementById('uploadProgressText');
     
+    const updateProgress = function(percentComplete) {
+        progressFill.style.width = percentComplete + '%';
+        progressText.textContent = Math.round(percentComplete) + '%';
+    };
+    
     try {
         progressDiv.style.display = 'block';
         
+        // Arquivos grandes: upload em blocos, retomável após quedas de conexão
+        const file = formData.get('file');
+        if (file && file.size > CHUNKED_UPLOAD_THRESHOLD) {
+            await uploadInChunks(file, formData.get('display_time'), updateProgress);
+            handleUploadComplete();
+            return;
+        }
+        
         const xhr = new XMLHttpRequest();
         
         xhr.upload.addEventListener('progress', function(e) {
             if (e.lengthComputable) {
-                const percentComplete = (e.loaded / e.total) * 100;
-                progressFill.style.width = percentComplete + '%';
-                progressText.textContent = Math.round(percentComplete) + '%';
+                updateProgress((e.loaded / e.total) * 100);
             }
         });
         
         xhr.addEventListener('load', function() {
             if (xhr.status === 201) {
-                closeUploadModal();
-                loadFiles();
-                loadActiveFiles(); // Recarregar dashboard
-                showSuccessMessage('Arquivo enviado com sucesso!');
+                handleUploadComplete();
             } else {
                 const error = JSON.parse(xhr.responseText);
                 alert('Erro: ' + error.error);
@@ -494,6 +719,141 @@ async function handleUpload(event) {
     }
 }
 
+function handleUploadComplete() {
+    closeUploadModal();
+    loadFiles();
+    loadActiveFiles(); // Recarregar dashboard
+    showSuccessMessage('Arquivo enviado com sucesso!');
+}
+
+// Upload em blocos: início, envio de blocos a partir do último offset confirmado e finalização
+async function uploadInChunks(file, displayTime, onProgress) {
+    const resumeKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+    
+    // SHA-256 do arquivo inteiro: conteúdo já armazenado não é reenviado e a
+    // finalização confere o que o servidor montou a partir dos blocos
+    const sha256 = await fileChecksum(file);
+    
+    let upload = await getUploadState(localStorage.getItem(resumeKey));
+    if (!upload) {
+        upload = await uploadRequest('/api/uploads', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                filename: file.name,
+                size: file.size,
+                display_time: Number(displayTime),
+                sha256: sha256
+            })
+        });
+        if (upload.complete) {
+            onProgress(100);
+            return upload;
+        }
+        localStorage.setItem(resumeKey, upload.upload_id);
+    }
+    
+    let offset = upload.offset;
+    let failures = 0;
+    onProgress((offset / file.size) * 100);
+    
+    while (offset < file.size) {
+        const chunk = file.slice(offset, offset + upload.chunk_size);
+        
+        try {
+            const headers = {
+                'Content-Type': 'application/octet-stream',
+                'Upload-Offset': String(offset)
+            };
+            const checksum = await chunkChecksum(chunk);
+            if (checksum) {
+                headers['Upload-Checksum'] = `sha256 ${checksum}`;
+            }
+            
+            const response = await fetch(`/api/uploads/${upload.upload_id}`, {
+                method: 'PATCH',
+                headers: headers,
+                body: chunk
+            });
+            const data = await response.json();
+            
+            if (response.ok) {
+                failures = 0;
+            } else if (data.offset === undefined) {
+                const error = new Error(data.error);
+                error.fatal = true;
+                throw error;
+            } else if (++failures > MAX_CHUNK_RETRIES) {
+                throw new Error(data.error);
+            }
+            // Em conflito (409) ou checksum inválido o servidor informa o offset confirmado
+            offset = data.offset;
+        } catch (error) {
+            if (error.fatal || ++failures > MAX_CHUNK_RETRIES) {
+                throw error;
+            }
+            // Queda de conexão: aguardar e retomar do offset confirmado pelo servidor
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+            const state = await getUploadState(upload.upload_id);
+            if (!state) {
+                throw error;
+            }
+            offset = state.offset;
+        }
+        
+        onProgress((offset / file.size) * 100);
+    }
+    
+    const result = await uploadRequest(`/api/uploads/${upload.upload_id}/complete`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(sha256 ? { sha256: sha256 } : {})
+    });
+    localStorage.removeItem(resumeKey);
+    return result;
+}
+
+async function getUploadState(uploadId) {
+    if (!uploadId) return null;
+    
+    try {
+        const response = await fetch(`/api/uploads/${uploadId}`);
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+async function uploadRequest(url, options) {
+    const response = await fetch(url, options);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.error);
+    }
+    return data;
+}
+
+async function chunkChecksum(chunk) {
+    // SubtleCrypto só está disponível em contextos seguros (HTTPS/localhost)
+    if (!window.crypto || !window.crypto.subtle) return null;
+    
+    const digest = await window.crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+    return btoa(String.fromCharCode(...new Uint8Array(digest)));
+}
+
+async function fileChecksum(file) {
+    // SHA-256 hexadecimal do arquivo (null fora de contextos seguros ou se falhar)
+    if (!window.crypto || !window.crypto.subtle) return null;
+    
+    try {
+        const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+        return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+    } catch (error) {
+        console.error('Erro ao calcular o checksum do arquivo:', error);
+        return null;
+    }
+}
+
 // Gerenciamento de usuários
 async function loadUsers() {
     try {